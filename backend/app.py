@@ -1,52 +1,102 @@
 import cv2
-import mediapipe as mp
 import numpy as np
 import os
-import base64
-from datetime import datetime
+import atexit
+import hashlib
+import itertools
+import logging
+import logging.handlers
+import queue
+import mimetypes
+import re
+import struct
 from io import BytesIO
 import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from cachetools import TTLCache
+import httpx
 from google import genai
 from google.genai import types
 from PIL import Image
 import platform
 import subprocess
 import time
+from urllib.parse import quote
 
-from flask import Flask, request, jsonify, send_from_directory, Response
+from flask import Flask, request, jsonify, send_from_directory, Response, stream_with_context, abort
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+from werkzeug.security import safe_join
+from flask_compress import Compress
 from dotenv import load_dotenv
 
 from story_video_generator import StoryVideoGenerator
 
+# pybase64 uses SIMD codecs and is several times faster on MB-sized images. The stdlib fallback
+# calls binascii directly: base64.b64decode only wraps it with extra argument checks
+try:
+    import pybase64
+    b64decode = pybase64.b64decode
+except ImportError:
+    from binascii import a2b_base64 as b64decode
+
+# orjson serializes and parses JSON several times faster than the stdlib json module
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Return the base64 payload of a data URL (or the input itself if it has no "data:...," header)
+def strip_data_url(data_url):
+    header, sep, payload = data_url.partition(',')
+    return payload if sep else header
+
 # Load environment variables
 load_dotenv()
 
-# Debug: Print current working directory and environment variables when the Flask app starts
-print(f"=== FLASK APP STARTUP DEBUG ===")
-print(f"Current working directory: {os.getcwd()}")
-print(f"GOOGLE_API_KEY available: {bool(os.getenv('GOOGLE_API_KEY'))}")
-print(f"GEMINI_API_KEY available: {bool(os.getenv('GEMINI_API_KEY'))}")
-print(f"Environment variables loaded from: {os.path.abspath('.env') if os.path.exists('.env') else 'No .env file found'}")
-print(f"=== END DEBUG ===")
-
-# Initialize MediaPipe Hand solution
-mp_hands = mp.solutions.hands
-mp_drawing = mp.solutions.drawing_utils
-hands = mp_hands.Hands(
-    static_image_mode=False,
-    max_num_hands=2,
-    min_detection_confidence=0.7,
-    min_tracking_confidence=0.7
+# Configure logging once; LOGLEVEL=DEBUG brings back the verbose per-request output.
+# Request threads only put records on a queue - a listener thread formats and writes them,
+# so a slow terminal never holds up a request. werkzeug's logger propagates to the same root
+log_handler = logging.StreamHandler()
+log_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(threadName)s %(message)s"))
+log_queue_handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+# QueueHandler pre-formats the message; keep it bare so the listener's format is applied once
+log_queue_handler.setFormatter(logging.Formatter("%(message)s"))
+log_listener = logging.handlers.QueueListener(log_queue_handler.queue, log_handler)
+log_listener.start()
+# Flush whatever is still queued when the server exits
+atexit.register(log_listener.stop)
+# force=True: story_video_generator calls basicConfig at import, which would otherwise leave
+# its INFO-level stderr handler on the root logger and turn this call (and LOGLEVEL) into a no-op
+logging.basicConfig(
+    level=os.getenv("LOGLEVEL", "INFO").upper(),
+    handlers=[log_queue_handler],
+    force=True
 )
+logger = logging.getLogger(__name__)
+
+# Debug: Log current working directory and environment variables when the Flask app starts
+logger.debug("Current working directory: %s", os.getcwd())
+logger.debug("GOOGLE_API_KEY available: %s", bool(os.getenv('GOOGLE_API_KEY')))
+logger.debug("GEMINI_API_KEY available: %s", bool(os.getenv('GEMINI_API_KEY')))
+logger.debug("Environment variables loaded from: %s",
+             os.path.abspath('.env') if os.path.exists('.env') else 'No .env file found')
 
 # Setup Google Generative AI
 GEMINI_API_KEY = os.getenv("GOOGLE_API_KEY")
 if not GEMINI_API_KEY:
-    print("Warning: GOOGLE_API_KEY not found in environment variables")
+    logger.warning("GOOGLE_API_KEY not found in environment variables")
 
-# Configure the Gemini client
-client = genai.Client(api_key=GEMINI_API_KEY)
+# Configure the Gemini client - HTTP/2 with a keep-alive pool lets concurrent enhancements
+# share one TLS connection instead of each paying for a new handshake
+client = genai.Client(
+    api_key=GEMINI_API_KEY,
+    http_options=types.HttpOptions(client_args={
+        "http2": True,
+        "limits": httpx.Limits(max_connections=32, max_keepalive_connections=16),
+    })
+)
 
 # Use Gemini 1.5 Pro since it has better image handling
 GEMINI_MODEL = "gemini-2.0-flash-exp-image-generation"  # Using the specified image generation model
@@ -55,19 +105,69 @@ GEMINI_MODEL = "gemini-2.0-flash-exp-image-generation"  # Using the specified im
 app = Flask(__name__)
 CORS(app)
 
+# jsonify and request.json go through orjson when it is installed. Keys may be non-strings
+# like the stdlib allows, and anything orjson cannot handle natively (dates, UUIDs, ...)
+# falls back to Flask's default conversion
+if orjson is not None:
+    class OrjsonProvider(DefaultJSONProvider):
+        def dumps(self, obj, **kwargs):
+            return orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS).decode()
+
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
+
+        # jsonify() bodies go out as the bytes orjson produced, without the str
+        # decode/re-encode round trip of the default dumps()-based response()
+        def response(self, *args, **kwargs):
+            obj = self._prepare_response_obj(args, kwargs)
+            option = orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE
+            if self.compact is False or (self.compact is None and self._app.debug):
+                option |= orjson.OPT_INDENT_2
+            body = orjson.dumps(obj, default=self.default, option=option)
+            return self._app.response_class(body, mimetype=self.mimetype)
+
+    app.json = OrjsonProvider(app)
+
+# gzip/br JSON responses - storyboard and status lists compress well.
+# Level 4 gets most of the size win at a fraction of the CPU of the defaults; tiny bodies are
+# sent as-is. Streamed responses (SSE) are left alone so events are not held back in the compressor
+app.config["COMPRESS_ALGORITHM"] = ["br", "gzip"]
+app.config["COMPRESS_LEVEL"] = 4
+app.config["COMPRESS_BR_LEVEL"] = 4
+app.config["COMPRESS_MIN_SIZE"] = 1024
+app.config["COMPRESS_STREAMS"] = False
+Compress(app)
+
+# Behind a server with mod_xsendfile (Apache, lighttpd), let it send image/video files itself:
+# send_from_directory then only sets an X-Sendfile header instead of streaming bytes through Python
+app.config["USE_X_SENDFILE"] = os.getenv("USE_X_SENDFILE", "").lower() in ("1", "true", "yes")
+
+# The nginx equivalent: with X_ACCEL_REDIRECT_PREFIX set (e.g. /_protected), media routes answer
+# with an X-Accel-Redirect to <prefix>/<folder>/<file> and nginx serves it from an internal
+# location aliased to the backend folder, handling Range and conditional requests itself
+X_ACCEL_REDIRECT_PREFIX = os.getenv("X_ACCEL_REDIRECT_PREFIX", "").rstrip("/")
+
 # Ensure directories exist
-img_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "img")
-enhanced_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "enhanced_drawings")
-story_videos_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "story_videos")
-gen_music_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gen_music")
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+img_dir = os.path.join(BASE_DIR, "img")
+enhanced_dir = os.path.join(BASE_DIR, "enhanced_drawings")
+story_videos_dir = os.path.join(BASE_DIR, "story_videos")
+gen_music_dir = os.path.join(BASE_DIR, "gen_music")
 os.makedirs(img_dir, exist_ok=True)
 os.makedirs(enhanced_dir, exist_ok=True)
 os.makedirs(story_videos_dir, exist_ok=True)
 os.makedirs(gen_music_dir, exist_ok=True)
 
 # Storyboard settings
-storyboard_images = []  # List to store storyboard images (filenames only)
-storyboard_image_data = []  # List to store storyboard image data for UI
+# Absolute image path -> image data for the UI, in storyboard order. Handlers run on several
+# threads, so every access goes through storyboard_lock
+storyboard = OrderedDict()
+storyboard_lock = threading.Lock()
+
+# Consistent copy of the storyboard as (image paths, image data list)
+def storyboard_snapshot():
+    with storyboard_lock:
+        return list(storyboard.keys()), list(storyboard.values())
 
 # Initialize video generator
 video_generator = StoryVideoGenerator(enhanced_dir=enhanced_dir, output_dir=story_videos_dir)
@@ -75,84 +175,402 @@ video_playing = False
 current_video = None
 
 # Store processing state
-processing_status = {}
-is_processing = False
-video_processing_status = {}
-is_video_processing = False
+# Clients poll an enhancement right after starting it, so finished entries only need to outlive
+# that polling; they expire after 10 minutes and the cache never grows past 1024 requests
+STATUS_TTL_SECONDS = 600
+processing_status = TTLCache(maxsize=1024, ttl=STATUS_TTL_SECONDS)
+processing_status_lock = threading.Lock()
+# Video statuses are small but a client may come back to a finished render later, so keep them longer
+VIDEO_STATUS_TTL_SECONDS = 1800
+video_processing_status = TTLCache(maxsize=512, ttl=VIDEO_STATUS_TTL_SECONDS)
+video_status_lock = threading.Lock()
 
-# Function to enhance drawing with Gemini - directly adapted from mvp2hands.py. Modify the prompts to take in some context from the user now.
-def enhance_drawing_with_gemini(image_path, prompt="", request_id=None):
-    global is_processing
+def get_video_status(request_id):
+    with video_status_lock:
+        return video_processing_status.get(request_id)
+
+def set_video_status(request_id, status):
+    with video_status_lock:
+        video_processing_status[request_id] = status
+    if status.get("status") in ("complete", "error"):
+        event = video_events.pop(request_id, None)
+        if event is not None:
+            event.set()
+
+# Wakes /api/video-stream listeners once a render reaches a final state
+video_events = {}  # request_id -> threading.Event
+
+# Video rendering is CPU-heavy, so only one runs at a time on a single reused worker thread;
+# the semaphore is taken by the request handler and released when the job finishes
+video_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="video")
+video_slot = threading.BoundedSemaphore(1)
+
+# Unique ids for request ids and saved filenames. The counter never repeats within a process and
+# the wall-clock start stamp keeps ids and filenames from a previous run (even one restarted within
+# the same second) from matching new ones - saved images are served as immutable, so names must not repeat
+_seq = itertools.count()
+_start_ns = time.time_ns()
+
+def next_request_id(prefix):
+    return f"{prefix}_{_start_ns:x}_{next(_seq)}"
+
+def next_filename(prefix, ext="png"):
+    return f"{prefix}-{int(time.time())}-{_start_ns:x}-{next(_seq)}.{ext}"
+
+# Gemini calls spend their time waiting on the network, so run several at once on a shared pool
+MAX_INFLIGHT = 8
+gemini_executor = ThreadPoolExecutor(max_workers=MAX_INFLIGHT, thread_name_prefix="gemini")
+# One slot per running enhancement. Taking a slot is atomic, so two simultaneous requests can
+# never both get past a full pool; the slot is released when the Gemini job finishes
+gemini_slots = threading.BoundedSemaphore(MAX_INFLIGHT)
+
+# Recent Gemini results keyed by a blake2b digest of image bytes + prompt, so retries and double-clicks skip the API call
+GEMINI_CACHE_SIZE = 128
+gemini_cache = OrderedDict()
+gemini_cache_lock = threading.Lock()
+
+# 128-bit blake2b of the canvas and prompt; hashed incrementally so the image bytes are not copied
+def gemini_cache_key(image_bytes, prompt_text):
+    digest = hashlib.blake2b(image_bytes, digest_size=16)
+    digest.update(b'\0')
+    digest.update(prompt_text.encode("utf-8"))
+    return digest.hexdigest()
+
+def get_cached_gemini_result(key):
+    with gemini_cache_lock:
+        result = gemini_cache.get(key)
+        if result is not None:
+            gemini_cache.move_to_end(key)
+        return result
+
+# Wakes /api/enhancement-stream listeners once a request reaches a final state
+enhancement_events = {}  # request_id -> threading.Event
+SSE_KEEPALIVE_SECONDS = 15
+
+def get_enhancement_status(request_id):
+    with processing_status_lock:
+        return processing_status.get(request_id)
+
+def set_enhancement_status(request_id, status):
+    with processing_status_lock:
+        processing_status[request_id] = status
+    if status.get("status") in ("complete", "error"):
+        event = enhancement_events.pop(request_id, None)
+        if event is not None:
+            event.set()
+
+# Status poll responses: never cache while the request is still running, but a final
+# (complete/error) status does not change again, so repeat polls can be answered by the browser
+def status_response(status):
+    response = jsonify(status)
+    if status.get("status") in ("complete", "error"):
+        response.headers["Cache-Control"] = "private, max-age=60"
+    else:
+        response.headers["Cache-Control"] = "no-store"
+    return response
+
+# 429 for a request turned away because its worker pool is full; Retry-After tells the client
+# roughly when a slot should be free again
+ENHANCE_RETRY_AFTER = 5  # seconds; a typical Gemini enhancement
+VIDEO_RETRY_AFTER = 30  # seconds; a storyboard video render
+
+def busy_response(message, retry_after):
+    response = jsonify({"error": message, "status": "busy"})
+    response.status_code = 429  # Too Many Requests
+    response.headers["Retry-After"] = str(retry_after)
+    return response
+
+# Voice save-and-enhance requests by canvas fingerprint (the gemini_cache_key of the decoded
+# image and prompt), so a repeated "enhance" on the same drawing joins the earlier request
+# instead of saving and uploading again
+RECENT_CANVAS_LIMIT = 32
+recent_canvas_requests = OrderedDict()  # fingerprint -> (request_id, filename)
+recent_canvas_lock = threading.Lock()
+
+# Earlier (request_id, filename) for this fingerprint while its status is still pending or complete
+def find_recent_canvas_request(fingerprint):
+    with recent_canvas_lock:
+        entry = recent_canvas_requests.get(fingerprint)
+    if entry is None:
+        return None
+    status = get_enhancement_status(entry[0])
+    if status is None or status.get("status") == "error":
+        return None
+    return entry
+
+def remember_canvas_request(fingerprint, request_id, filename):
+    with recent_canvas_lock:
+        recent_canvas_requests[fingerprint] = (request_id, filename)
+        recent_canvas_requests.move_to_end(fingerprint)
+        while len(recent_canvas_requests) > RECENT_CANVAS_LIMIT:
+            recent_canvas_requests.popitem(last=False)
+
+# Voice save-and-enhance writes its canvas on a small I/O pool while the same bytes go to Gemini;
+# anything that opens one of those files (enhance, /img, storyboard) waits on the per-file event first
+SAVE_WAIT_SECONDS = 2.0
+io_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="io")
+pending_saves = {}  # filename -> threading.Event, set once the file is fully on disk
+pending_saves_lock = threading.Lock()
+
+# O_BINARY keeps Windows from translating newlines in image bytes (it is 0 elsewhere)
+WRITE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+
+def write_all(fd, data):
+    view = memoryview(data)
+    while view:
+        written = os.write(fd, view)
+        view = view[written:]
+
+def write_file(filepath, data):
+    fd = os.open(filepath, WRITE_FLAGS, 0o644)
+    try:
+        write_all(fd, data)
+    finally:
+        os.close(fd)
+
+# Decode a base64 data URL (or bare base64 text) into filepath slice by slice, so neither a
+# stripped copy of the payload nor the whole decoded image is held in memory at once.
+# Returns the number of bytes written; a payload that fails to decode leaves no file behind
+BASE64_CHUNK = 1 << 16  # a multiple of 4, so no base64 quantum is split across slices
+
+def write_base64_file(filepath, data_url):
+    # Skip a "data:...," header of any length; a bare base64 string starts at 0
+    start = data_url.find(',') + 1 if data_url.startswith('data:') else 0
+    total = 0
+    fd = os.open(filepath, WRITE_FLAGS, 0o644)
+    try:
+        try:
+            for offset in range(start, len(data_url), BASE64_CHUNK):
+                chunk = b64decode(data_url[offset:offset + BASE64_CHUNK])
+                write_all(fd, chunk)
+                total += len(chunk)
+        finally:
+            os.close(fd)
+    except Exception:
+        os.remove(filepath)
+        raise
+    return total
+
+def save_file_async(filepath, data):
+    filename = os.path.basename(filepath)
+    event = threading.Event()
+    with pending_saves_lock:
+        pending_saves[filename] = event
+
+    def write_and_signal():
+        try:
+            write_file(filepath, data)
+            logger.info("Image saved to %s", filepath)
+        except Exception:
+            logger.exception("Error writing %s", filepath)
+        finally:
+            with pending_saves_lock:
+                if pending_saves.get(filename) is event:
+                    del pending_saves[filename]
+            event.set()
+
+    io_executor.submit(write_and_signal)
 
-    print(f"enhance_drawing_with_gemini called with prompt: {prompt}")
+# Block until a queued write of filename has finished; returns False on timeout
+def wait_for_save(filename, timeout=SAVE_WAIT_SECONDS):
+    with pending_saves_lock:
+        event = pending_saves.get(filename)
+    return event is None or event.wait(timeout)
+
+# Block until every queued write has finished; returns False on timeout
+def wait_for_all_saves(timeout=SAVE_WAIT_SECONDS):
+    deadline = time.time() + timeout
+    with pending_saves_lock:
+        events = list(pending_saves.values())
+    return all(event.wait(max(0, deadline - time.time())) for event in events)
+
+# Gemini resizes inputs to about this long edge anyway, so larger canvases only cost upload time
+GEMINI_MAX_EDGE = 1024
+# JPEG settings for downscaled uploads; optimized Huffman tables shave a few % more at no quality cost
+GEMINI_JPEG_PARAMS = [int(cv2.IMWRITE_JPEG_QUALITY), 85, int(cv2.IMWRITE_JPEG_OPTIMIZE), 1]
+
+# Shrink an image to GEMINI_MAX_EDGE on its long edge; returns (bytes, mime_type), unchanged if already small
+def downscale_for_gemini(image_bytes, mime_type, width, height):
+    long_edge = max(width, height)
+    if long_edge <= GEMINI_MAX_EDGE:
+        return image_bytes, mime_type
+    img = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        return image_bytes, mime_type
+    scale = GEMINI_MAX_EDGE / long_edge
+    img = cv2.resize(img, (max(1, int(width * scale)), max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
+    ok, jpeg_buf = cv2.imencode('.jpg', img, GEMINI_JPEG_PARAMS)
+    if not ok:
+        return image_bytes, mime_type
+    return jpeg_buf.tobytes(), "image/jpeg"
+
+def cache_gemini_result(key, result):
+    with gemini_cache_lock:
+        gemini_cache[key] = result
+        gemini_cache.move_to_end(key)
+        while len(gemini_cache) > GEMINI_CACHE_SIZE:
+            gemini_cache.popitem(last=False)
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# Read (width, height) from the IHDR chunk of PNG data, or None if the data is not a PNG
+# (or is cut off before the size)
+def get_png_size(header):
+    if len(header) >= 24 and header[:8] == PNG_SIGNATURE and header[12:16] == b'IHDR':
+        return struct.unpack('>II', header[16:24])
+    return None
+
+# Start-of-frame markers carry the image size (DHT, JPG and DAC share the range but do not)
+JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+# Read (width, height) from the SOF segment of a JPEG file object, or None if it is not a JPEG.
+# Walks the segment headers and seeks past their payloads, so EXIF blocks are never read
+def get_jpeg_size(f):
+    if f.read(2) != b'\xff\xd8':
+        return None
+    while True:
+        byte = f.read(1)
+        if byte != b'\xff':
+            return None
+        while byte == b'\xff':  # markers may be preceded by fill bytes
+            byte = f.read(1)
+        if not byte:
+            return None
+        marker = byte[0]
+        if 0xD0 <= marker <= 0xD7 or marker == 0x01:  # standalone markers have no length
+            continue
+        length_bytes = f.read(2)
+        if len(length_bytes) < 2:
+            return None
+        segment_length = struct.unpack('>H', length_bytes)[0]
+        if marker in JPEG_SOF_MARKERS:
+            frame = f.read(5)  # sample precision, height, width
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack('>HH', frame[1:5])
+            return width, height
+        if marker == 0xDA or segment_length < 2:  # start of scan without a frame header
+            return None
+        f.seek(segment_length - 2, 1)
+
+# Get image dimensions without decoding the pixel data
+def get_image_size(image_path):
+    with open(image_path, 'rb') as f:
+        size = get_png_size(f.read(24))
+        if size is None:
+            f.seek(0)
+            size = get_jpeg_size(f)
+    if size is not None:
+        return size
+    # Neither PNG nor JPEG - PIL only parses the header until pixels are accessed
+    with Image.open(image_path) as img:
+        return img.size
+
+# Most recent enhancement result, recorded by the Gemini jobs so /api/modify-image does not have
+# to scan enhanced_dir every time. Re-checked against the folder once it is LATEST_ENHANCED_TTL
+# old, since other tools (mvp2hands.py) can also drop results there
+LATEST_ENHANCED_TTL = 60.0
+latest_enhanced = {"path": None, "recorded_at": 0.0}
+latest_enhanced_lock = threading.Lock()
+
+def record_latest_enhanced(path):
+    with latest_enhanced_lock:
+        latest_enhanced["path"] = path
+        latest_enhanced["recorded_at"] = time.time()
+
+# Path of the newest enhanced PNG, or None if there is none
+def find_latest_enhanced():
+    with latest_enhanced_lock:
+        path, recorded_at = latest_enhanced["path"], latest_enhanced["recorded_at"]
+    if path is not None and time.time() - recorded_at < LATEST_ENHANCED_TTL and os.path.exists(path):
+        return path
     
-    print(f"🔍 DEBUG: enhance_drawing_with_gemini called with:")
-    print(f"   - image_path: {image_path}")
-    print(f"   - prompt: '{prompt}'")
-    print(f"   - request_id: {request_id}")
+    # Filenames carry a per-process counter, so go by mtime - one pass, no intermediate list
+    with os.scandir(enhanced_dir) as entries:
+        latest = max((entry for entry in entries
+                      if entry.name.startswith(('enhanced-', 'enhanced_')) and entry.name.endswith('.png')),
+                     key=lambda entry: entry.stat().st_mtime_ns, default=None)
+    if latest is None:
+        return None
+    record_latest_enhanced(latest.path)
+    return latest.path
+
+# Function to enhance drawing with Gemini - directly adapted from mvp2hands.py. Modify the prompts to take in some context from the user now.
+# Returns False without queuing anything when all MAX_INFLIGHT slots are taken; otherwise True, with
+# progress (or the error) recorded in processing_status under request_id. Callers that already
+# hold the image in memory pass image_bytes, and the job skips waiting for and reading the file
+def enhance_drawing_with_gemini(image_path, prompt="", request_id=None, image_bytes=None):
+    logger.debug("enhance_drawing_with_gemini called with image_path=%s prompt=%r request_id=%s",
+                 image_path, prompt, request_id)
     
     if not GEMINI_API_KEY:
         error_msg = "Error: Gemini API key is not set. Cannot enhance drawing."
-        print(error_msg)
-        processing_status[request_id] = {"status": "error", "message": error_msg}
-        is_processing = False
-        return None
+        logger.error(error_msg)
+        set_enhancement_status(request_id, {"status": "error", "message": error_msg})
+        return True
+    
+    if not gemini_slots.acquire(blocking=False):
+        logger.info("Enhancement %s rejected: too many enhancements already in progress", request_id)
+        return False
     
+    queued = False
     try:
-        # Read the image
-        drawing = cv2.imread(image_path)
-        if drawing is None:
-            error_msg = f"Error: Could not read image from {image_path}"
-            print(error_msg)
-            processing_status[request_id] = {"status": "error", "message": error_msg}
-            is_processing = False
-            return None
-        
-        # Convert OpenCV image to PIL Image
-        drawing_rgb = cv2.cvtColor(drawing, cv2.COLOR_BGR2RGB)
-        pil_image = Image.fromarray(drawing_rgb)
+        mime_type = mimetypes.guess_type(image_path)[0] or "image/png"
         
-        # Get original image dimensions
-        original_width, original_height = pil_image.size
-        
-        # Convert the image to bytes and then to base64
-        buffered = BytesIO()
-        pil_image.save(buffered, format="JPEG")
-        img_base64 = base64.b64encode(buffered.getvalue()).decode("utf-8")
-        
-        # Create a thread to handle the Gemini API call
-        def process_with_gemini(prompt_text):
-            global is_processing
+        # Runs on the Gemini pool - all disk I/O happens here, not on the request thread
+        def process_with_gemini(prompt_text, image_bytes):
             try:
-                print(f"🔍 DEBUG: process_with_gemini called with prompt_text: '{prompt_text}'")
+                # Read the raw file bytes - the canvas PNG is already compressed, so send it as-is.
+                # The image may still be queued for writing by save_file_async, so wait for that first
+                if image_bytes is None:
+                    try:
+                        if not wait_for_save(os.path.basename(image_path)):
+                            raise OSError("timed out waiting for the file to be written")
+                        with open(image_path, 'rb') as f:
+                            image_bytes = f.read()
+                    except OSError as read_error:
+                        error_msg = f"Error: Could not read image from {image_path}: {read_error}"
+                        logger.error(error_msg)
+                        set_enhancement_status(request_id, {"status": "error", "message": error_msg})
+                        return
+                
+                # Get original image dimensions from the header instead of decoding pixels
+                original_width, original_height = (get_png_size(image_bytes) or get_jpeg_size(BytesIO(image_bytes))
+                                                    or Image.open(BytesIO(image_bytes)).size)
                 
                 # Default prompt if none provided
                 if not prompt_text:
                     prompt_text = "Enhance this sketch into an image with more detail."
-                    print(f"🔍 DEBUG: Using default prompt: '{prompt_text}'")
+                    logger.debug("Using default prompt: %r", prompt_text)
                 else:
-                    print(f"🔍 DEBUG: Using provided prompt: '{prompt_text}'")
+                    logger.debug("Using provided prompt: %r", prompt_text)
                 
-                print(f"Processing with prompt: {prompt_text}")
-                print(f"Using model: {GEMINI_MODEL}")
-                print(f"API Key available: {bool(GEMINI_API_KEY)}")
+                # Identical canvas + prompt was enhanced recently - reuse that result
+                cache_key = gemini_cache_key(image_bytes, prompt_text)
+                cached_result = get_cached_gemini_result(cache_key)
+                if cached_result is not None and os.path.exists(cached_result["absolute_path"]):
+                    logger.info("Using cached Gemini result for request %s", request_id)
+                    record_latest_enhanced(cached_result["absolute_path"])
+                    set_enhancement_status(request_id, {"status": "complete", "result": dict(cached_result)})
+                    return
                 
-                # Prepare the prompt and image data
+                logger.info("Processing request %s with model %s, prompt: %s", request_id, GEMINI_MODEL, prompt_text)
+                
+                # Oversize canvases are shrunk before upload; original_width/height keep the pre-resize size
+                upload_bytes, upload_mime_type = downscale_for_gemini(
+                    image_bytes, mime_type, original_width, original_height)
+                
+                # Prepare the prompt and image data - the SDK sends the raw bytes, no base64 step needed
                 contents = [
-                    {"text": prompt_text},
-                    {"inlineData": {
-                        "mimeType": "image/jpeg",
-                        "data": img_base64
-                    }}
+                    prompt_text,
+                    types.Part.from_bytes(data=upload_bytes, mime_type=upload_mime_type)
                 ]
                 
-                print(f"Contents structure: {contents}")
+                logger.debug("Contents: prompt + %s image (%d bytes)", upload_mime_type, len(upload_bytes))
                 
                 # Set the configuration
                 config = types.GenerateContentConfig(response_modalities=['Text', 'Image'])
                 
-                print(f"Config: {config}")
-                
                 # Generate the enhanced image
                 # client = genai.Client(api_key=GEMINI_API_KEY)
                 try:
@@ -160,114 +578,107 @@ def enhance_drawing_with_gemini(image_path, prompt="", request_id=None):
                         model=GEMINI_MODEL,
                         contents=contents,
                         config=config)
-                                        
-                    print("RESPONSE: ", response)
+                    
+                    # Only a summary - repr(response) would include the whole generated image
+                    logger.debug("Gemini response received for %s, parts=%d",
+                                 request_id, len(response.candidates[0].content.parts))
                         
                 except Exception as api_error:
                     error_msg = f"Gemini API error: {str(api_error)}"
-                    print(error_msg)
-                    print(f"Error type: {type(api_error)}")
-                    print(f"Error details: {api_error}")
-                    processing_status[request_id] = {"status": "error", "message": error_msg}
-                    is_processing = False
+                    logger.error("%s (%s)", error_msg, type(api_error).__name__)
+                    set_enhancement_status(request_id, {"status": "error", "message": error_msg})
                     return
                 
                 # Process the response
                 success = False
+                image_error_msg = None
                 
                 for part in response.candidates[0].content.parts:
                     if hasattr(part, 'text') and part.text is not None:
-                        print("Text response:", part.text)
+                        logger.debug("Text response: %s", part.text)
                     elif hasattr(part, 'inline_data') and part.inline_data is not None:
                         try:
-                            # Convert the generated image to OpenCV format
-                            image_data = part.inline_data.data
+                            # The SDK already returns the generated image as raw bytes
+                            enhanced_bytes = part.inline_data.data
                             
-                            # Make sure we're working with bytes
-                            if isinstance(image_data, str):
-                                image_bytes = base64.b64decode(image_data)
+                            png_size = get_png_size(enhanced_bytes)
+                            if png_size is not None:
+                                # Gemini already sent a PNG - store and forward its bytes untouched
+                                enhanced_width, enhanced_height = png_size
+                                png_buf = enhanced_bytes
                             else:
-                                image_bytes = image_data
+                                # Decode once with OpenCV (BGR in, BGR out keeps the colors unchanged)
+                                img = cv2.imdecode(np.frombuffer(enhanced_bytes, np.uint8), cv2.IMREAD_COLOR)
+                                if img is None:
+                                    raise ValueError("Gemini returned image data that could not be decoded")
                                 
-                            # Open as PIL Image
-                            image = Image.open(BytesIO(image_bytes))
-                            img_array = np.array(image)
-                            
-                            # The image from Gemini is already in RGB format (PIL format)
-                            # Save the enhanced image in RGB format to avoid color space issues
-                            # Get enhanced image dimensions
-                            enhanced_width, enhanced_height = image.size
+                                # Get enhanced image dimensions
+                                enhanced_height, enhanced_width = img.shape[:2]
+                                
+                                # Encode a single PNG (level 3 is ~2x faster than the default 6 for a
+                                # few percent more bytes) and use that buffer for both disk and base64
+                                ok, png_buf = cv2.imencode('.png', img, [int(cv2.IMWRITE_PNG_COMPRESSION), 3])
+                                if not ok:
+                                    raise ValueError("Failed to encode enhanced image as PNG")
                             
-                            # Save the enhanced image in RGB format using PIL
-                            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                            enhanced_filename = f"enhanced_{timestamp}.png"
+                            enhanced_filename = next_filename("enhanced")
                             enhanced_path = os.path.join(enhanced_dir, enhanced_filename)
-                            image.save(enhanced_path, format="PNG")
-                            print(f"Enhanced image saved to {enhanced_path}")
+                            with open(enhanced_path, 'wb') as f:
+                                f.write(png_buf)
+                            logger.info("Enhanced image saved to %s", enhanced_path)
+                            record_latest_enhanced(enhanced_path)
                             
-                            # Create base64 image data from the RGB array for frontend
-                            # Use the same PIL image for base64 encoding
-                            img_buffer = BytesIO()
-                            image.save(img_buffer, format="PNG")
-                            enhanced_base64 = base64.b64encode(img_buffer.getvalue()).decode("utf-8")
-                            print(f"Generated base64 data length: {len(enhanced_base64)}")
-                            
-                            # Update response status with additional data needed for interactive behavior
-                            processing_status[request_id] = {
-                                "status": "complete",
-                                "result": {
-                                    "filename": enhanced_filename,
-                                    "path": f"/enhanced_drawings/{enhanced_filename}",
-                                    "absolute_path": enhanced_path,
-                                    "width": enhanced_width,
-                                    "height": enhanced_height,
-                                    "original_width": original_width,
-                                    "original_height": original_height,
-                                    "base64Data": enhanced_base64,
-                                    "prompt": prompt_text
-                                }
+                            # Update response status with additional data needed for interactive behavior.
+                            # The browser loads the image from path, so no base64 copy rides along in the JSON
+                            result = {
+                                "filename": enhanced_filename,
+                                "path": f"/enhanced_drawings/{enhanced_filename}",
+                                "absolute_path": enhanced_path,
+                                "width": enhanced_width,
+                                "height": enhanced_height,
+                                "original_width": original_width,
+                                "original_height": original_height,
+                                "prompt": prompt_text
                             }
+                            cache_gemini_result(cache_key, result)
+                            set_enhancement_status(request_id, {"status": "complete", "result": result})
                             success = True
                             break
                         except Exception as img_error:
-                            print(f"Error processing image data: {str(img_error)}")
-                            processing_status[request_id] = {
-                                "status": "error", 
-                                "message": f"Error processing image data: {str(img_error)}"
-                            }
+                            logger.exception("Error processing image data")
+                            image_error_msg = f"Error processing image data: {str(img_error)}"
                 
                 # If no image was found in the response
                 if not success:
-                    error_msg = "No enhanced image found in Gemini response"
-                    print(error_msg)
-                    processing_status[request_id] = {"status": "error", "message": error_msg}
+                    error_msg = image_error_msg or "No enhanced image found in Gemini response"
+                    logger.error(error_msg)
+                    set_enhancement_status(request_id, {"status": "error", "message": error_msg})
             
             except Exception as e:
                 error_msg = f"Error enhancing drawing with Gemini: {str(e)}"
-                print(error_msg)
-                print(f"Full error details: {e}")
-                import traceback
-                traceback.print_exc()
-                processing_status[request_id] = {"status": "error", "message": error_msg}
+                logger.exception(error_msg)
+                set_enhancement_status(request_id, {"status": "error", "message": error_msg})
             
             finally:
-                is_processing = False
+                gemini_slots.release()
         
-        # Start the processing thread
-        processing_status[request_id] = {"status": "processing"}
-        is_processing = True
+        # Queue the Gemini API call on the shared worker pool
+        set_enhancement_status(request_id, {"status": "processing"})
+        gemini_executor.submit(process_with_gemini, prompt, image_bytes)
+        queued = True
         
-        # Create a thread to handle the Gemini API call
-        threading.Thread(target=process_with_gemini, args=(prompt,)).start()
-        
-        return None
+        return True
         
     except Exception as e:
         error_msg = f"Error preparing drawing for Gemini: {str(e)}"
-        print(error_msg)
-        processing_status[request_id] = {"status": "error", "message": error_msg}
-        is_processing = False
-        return None
+        logger.exception(error_msg)
+        set_enhancement_status(request_id, {"status": "error", "message": error_msg})
+        return True
+    
+    finally:
+        # The job releases its own slot; anything that never got queued gives it back here
+        if not queued:
+            gemini_slots.release()
 
 # Function to determine hand gestures and mode - from mvp2hands.py
 # This is not used directly in the web API but kept for reference
@@ -301,154 +712,122 @@ def determine_hand_mode(landmarks):
         # Any other hand position
         return "None", fingers_extended
 
+# URL the frontend can load a storyboard image from, or None if it is outside the served folders
+def storyboard_url(image_path):
+    folder, filename = os.path.split(image_path)
+    if folder == enhanced_dir:
+        return f"/enhanced_drawings/{filename}"
+    if folder == img_dir:
+        return f"/img/{filename}"
+    return None
+
 # Function to add image to storyboard
 def add_to_storyboard(image_path, image_data=None):
     """Add an image to the storyboard by its file path and optionally image data"""
-    global storyboard_images, storyboard_image_data
-    
-    print(f"add_to_storyboard called with image_path: {image_path}")
-    print(f"Current storyboard_images before adding: {storyboard_images}")
+    logger.debug("add_to_storyboard called with image_path=%s", image_path)
     
     # Check if the file exists
     if not os.path.exists(image_path):
-        print(f"Error: Image file {image_path} not found")
+        logger.error("Image file %s not found", image_path)
         return False
     
     # Check if image is already in storyboard to prevent duplicates
-    if image_path in storyboard_images:
-        print(f"Image {image_path} is already in storyboard, skipping duplicate")
-        return True  # Return True since the image is already there
+    with storyboard_lock:
+        if image_path in storyboard:
+            logger.info("Image %s is already in storyboard, skipping duplicate", image_path)
+            return True  # Return True since the image is already there
     
-    # Add the file path to storyboard images
-    storyboard_images.append(image_path)
-    print(f"Added {image_path} to storyboard_images")
-    print(f"Storyboard_images after adding: {storyboard_images}")
-    
-    # If image data is provided, add it to the storyboard image data
-    if image_data:
-        storyboard_image_data.append(image_data)
-        print(f"Added provided image_data to storyboard_image_data")
-    else:
-        # Read image and convert to base64 for client display
+    # Build the image data outside the lock. Only metadata is kept - the browser loads the
+    # image itself from its URL, where it can be cached, instead of inline base64 in every response
+    if not image_data:
         try:
-            # Try to read as PIL Image first (for RGB images)
-            try:
-                pil_img = Image.open(image_path)
-                # Convert PIL image to RGB if it's not already
-                if pil_img.mode != 'RGB':
-                    pil_img = pil_img.convert('RGB')
-                
-                # Convert to base64
-                img_buffer = BytesIO()
-                pil_img.save(img_buffer, format='PNG')
-                img_base64 = base64.b64encode(img_buffer.getvalue()).decode('utf-8')
-                
-                # Get image dimensions
-                width, height = pil_img.size
-                
-            except Exception as pil_error:
-                # Fallback to OpenCV for BGR images
-                print(f"PIL failed, trying OpenCV: {pil_error}")
-                img = cv2.imread(image_path)
-                if img is not None:
-                    # Convert BGR to RGB to fix color inversion issue
-                    img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-                    _, buffer = cv2.imencode('.png', img)
-                    img_base64 = base64.b64encode(buffer).decode('utf-8')
-                    
-                    # Get image dimensions
-                    height, width = img.shape[:2]
-                else:
-                    raise Exception("Could not read image with either PIL or OpenCV")
-            
-            storyboard_image_data.append({
+            width, height = get_image_size(image_path)
+            image_data = {
                 "path": image_path,
                 "filename": os.path.basename(image_path),
-                "base64Data": img_base64,
+                "url": storyboard_url(image_path),
                 "width": width,
                 "height": height
-            })
-            print(f"Added image data for {os.path.basename(image_path)} to storyboard_image_data")
+            }
         except Exception as e:
-            print(f"Error reading image for storyboard: {str(e)}")
+            logger.exception("Error reading image for storyboard: %s", e)
             return False
     
-    print(f"Final storyboard_images: {storyboard_images}")
-    print(f"Final storyboard_image_data filenames: {[img.get('filename', 'unknown') for img in storyboard_image_data]}")
+    # setdefault keeps the first entry if another request added the same image meanwhile
+    with storyboard_lock:
+        storyboard.setdefault(image_path, image_data)
+        count = len(storyboard)
+    logger.info("Added %s to storyboard (%d images)", image_path, count)
     return True
 
 # Function to generate and play video (background processing)
 def generate_video_background(request_id, story_context=None, include_music=False):
-    global is_video_processing
-    
     try:
-        video_processing_status[request_id] = {"status": "processing", "message": "Video generation started"}
+        storyboard_images, _ = storyboard_snapshot()
         
         # Ensure we have enough images
         if len(storyboard_images) < 2:
             error_msg = "Need at least 2 images to generate a video"
-            print(error_msg)
-            video_processing_status[request_id] = {"status": "error", "message": error_msg}
-            is_video_processing = False
+            logger.error(error_msg)
+            set_video_status(request_id, {"status": "error", "message": error_msg})
             return
         
-        print(f"Storyboard images before video generation: {storyboard_images}")
-        print(f"Number of storyboard images: {len(storyboard_images)}")
-        print(f"Include music: {include_music}")
-        for i, img_path in enumerate(storyboard_images):
-            print(f"Storyboard image {i+1}: {img_path}")
+        logger.info("Generating video %s from %d storyboard images, include music: %s",
+                    request_id, len(storyboard_images), include_music)
+        logger.debug("Storyboard images: %s", storyboard_images)
         
         # Generate video using the storyboard images, pass include_music parameter
         video_path = video_generator.generate_video(storyboard_images, story_context, include_music)
         
         if video_path:
-            # Get relative path for client
-            rel_path = os.path.relpath(video_path, os.path.dirname(os.path.abspath(__file__)))
             video_url = f"/videos/{os.path.basename(video_path)}"
-            print(f"Video generated successfully: {video_path}")
+            logger.info("Video generated successfully: %s", video_path)
             
-            video_processing_status[request_id] = {
+            set_video_status(request_id, {
                 "status": "complete", 
                 "result": {
                     "path": video_path,
                     "url": video_url,
                     "filename": os.path.basename(video_path)
                 }
-            }
+            })
         else:
-            video_processing_status[request_id] = {"status": "error", "message": "Failed to generate video"}
+            set_video_status(request_id, {"status": "error", "message": "Failed to generate video"})
     except Exception as e:
         error_msg = f"Error generating video: {str(e)}"
-        print(error_msg)
-        import traceback
-        traceback.print_exc()
-        video_processing_status[request_id] = {"status": "error", "message": error_msg}
+        logger.exception(error_msg)
+        set_video_status(request_id, {"status": "error", "message": error_msg})
     finally:
-        is_video_processing = False
+        video_slot.release()
 
 # API endpoint to save canvas image
 @app.route('/api/save-image', methods=['POST'])
 def save_image():
     try:
-        data = request.json
-        image_data = data.get('imageData')
-        
-        if not image_data:
-            return jsonify({"error": "No image data provided"}), 400
-        
-        # Extract the base64 data from the data URL
-        base64_data = image_data.replace('data:image/png;base64,', '')
-        
-        # Generate a unique filename with timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"canvas-drawing-{timestamp}.png"
+        # Generate a unique filename
+        filename = next_filename("canvas-drawing")
         filepath = os.path.join(img_dir, filename)
         
-        # Save the file
-        with open(filepath, 'wb') as f:
-            f.write(base64.b64decode(base64_data))
+        # Write before answering, so a success response means the file is on disk
+        if request.mimetype == 'image/png':
+            # Raw PNG body (canvas.toBlob) - no JSON parsing or base64 decoding needed
+            image_bytes = request.get_data(cache=False)
+            if not image_bytes:
+                return jsonify({"error": "No image data provided"}), 400
+            write_file(filepath, image_bytes)
+        else:
+            # Legacy JSON body with a base64 data URL, decoded straight into the file
+            data = request.json
+            image_data = data.get('imageData')
+            
+            if not image_data:
+                return jsonify({"error": "No image data provided"}), 400
+            
+            if not write_base64_file(filepath, image_data):
+                os.remove(filepath)
+                return jsonify({"error": "No image data provided"}), 400
         
-        print(f"Image saved to {filepath}")
+        logger.info("Image saved to %s", filepath)
         
         # Return the file path
         return jsonify({
@@ -458,54 +837,49 @@ def save_image():
             "absolutePath": filepath
         })
     except Exception as e:
-        print(f"Error saving image: {str(e)}")
+        logger.exception("Error saving image: %s", e)
         return jsonify({"error": "Failed to save image", "details": str(e)}), 500
 
 # API endpoint to enhance an image
 @app.route('/api/enhance-image', methods=['POST'])
 def enhance_image():
-    global is_processing
-    
     try:
         data = request.json
         filename = data.get('filename')
         prompt = data.get('prompt', '')
         
-        print(f"Received enhancement request for file: {filename}, with prompt: {prompt}")
+        logger.info("Received enhancement request for file %s with prompt: %s", filename, prompt)
         
         if not filename:
             return jsonify({"error": "No filename provided"}), 400
         
-        # Check if another enhancement is already in progress
-        if is_processing:
-            print("Enhancement request rejected: Another enhancement is already in progress")
-            return jsonify({
-                "error": "Another enhancement is already in progress", 
-                "status": "busy"
-            }), 429  # Too Many Requests
-        
         # Construct the path to the saved image
         filepath = os.path.join(img_dir, filename)
         
+        # A voice save-and-enhance canvas may still be on its way to disk
+        if not wait_for_save(filename):
+            logger.warning("Enhancement request rejected: timed out waiting for %s to be written", filename)
+            return jsonify({"error": f"Image file {filename} is still being saved"}), 503
+        
         if not os.path.exists(filepath):
-            print(f"Enhancement request rejected: File {filename} not found at {filepath}")
+            logger.warning("Enhancement request rejected: file %s not found at %s", filename, filepath)
             return jsonify({"error": f"Image file {filename} not found"}), 404
         
-        # Check if file is a valid image
+        # Check if file is a valid image (header only, no pixel decode)
         try:
-            img = Image.open(filepath)
-            img_width, img_height = img.size
-            print(f"Image validation successful. Dimensions: {img_width}x{img_height}")
+            img_width, img_height = get_image_size(filepath)
+            logger.debug("Image validation successful. Dimensions: %dx%d", img_width, img_height)
         except Exception as img_error:
-            print(f"Enhancement request rejected: Invalid image file - {str(img_error)}")
+            logger.warning("Enhancement request rejected: invalid image file - %s", img_error)
             return jsonify({"error": f"Invalid image file: {str(img_error)}"}), 400
         
         # Generate a unique request ID
-        request_id = f"req_{datetime.now().timestamp()}"
-        print(f"Starting enhancement with request ID: {request_id}")
+        request_id = next_request_id("req")
+        logger.info("Starting enhancement with request ID %s", request_id)
         
-        # Trigger the enhancement in a background thread
-        enhance_drawing_with_gemini(filepath, prompt, request_id)
+        # Queue the enhancement on the Gemini pool, or turn the request away if the pool is full
+        if not enhance_drawing_with_gemini(filepath, prompt, request_id):
+            return busy_response("Too many enhancements already in progress", ENHANCE_RETRY_AFTER)
         
         # Return immediately with the request ID for status polling
         return jsonify({
@@ -515,39 +889,60 @@ def enhance_image():
         })
     except Exception as e:
         error_msg = f"Error requesting image enhancement: {str(e)}"
-        print(error_msg)
-        # Log detailed error information for debugging
-        import traceback
-        traceback.print_exc()
+        logger.exception(error_msg)
         return jsonify({"error": "Failed to process enhancement request", "details": str(e)}), 500
 
 # API endpoint to check the status of an enhancement request
 @app.route('/api/enhancement-status/<request_id>', methods=['GET'])
 def check_enhancement_status(request_id):
     try:
-        print(f"Checking status for request ID: {request_id}")
+        status = get_enhancement_status(request_id)
+        if status is None:
+            logger.info("Request ID not found: %s", request_id)
+            return jsonify({"error": "Request ID not found or expired"}), 404
         
-        if request_id not in processing_status:
-            print(f"Request ID not found: {request_id}")
-            return jsonify({"error": "Request ID not found"}), 404
+        logger.debug("Status for request %s: %s", request_id, status.get('status', 'unknown'))
         
-        status = processing_status[request_id]
-        print(f"Status for request {request_id}: {status.get('status', 'unknown')}")
-        
-        # If processing is complete, we can clean up the status entry
-        if status.get("status") in ["complete", "error"]:
-            # Keep the status for a while in case of multiple polls
-            # In a production app, you might want to implement a cleanup strategy
-            pass
-        
-        return jsonify(status)
+        # Finished entries stay available for repeated polls until the TTL drops them
+        return status_response(status)
     except Exception as e:
         error_msg = f"Error checking enhancement status: {str(e)}"
-        print(error_msg)
-        import traceback
-        traceback.print_exc()
+        logger.exception(error_msg)
         return jsonify({"error": "Error checking status", "details": str(e)}), 500
 
+# API endpoint to stream the result of an enhancement request (Server-Sent Events)
+# Holds one connection open until the request finishes instead of the client polling enhancement-status
+@app.route('/api/enhancement-stream/<request_id>', methods=['GET'])
+def stream_enhancement_status(request_id):
+    if get_enhancement_status(request_id) is None:
+        logger.info("Request ID not found: %s", request_id)
+        return jsonify({"error": "Request ID not found or expired"}), 404
+    
+    return stream_final_status(request_id, get_enhancement_status, enhancement_events)
+
+# Server-Sent Events response that sends a request's status once it is final (complete/error),
+# with keepalive comments while it is still running. The status setter sets the event in events
+def stream_final_status(request_id, get_status, events):
+    def generate():
+        while True:
+            # Register for the wake-up before reading the status so a finish in between is not missed
+            event = events.setdefault(request_id, threading.Event())
+            status = get_status(request_id)
+            if status is None or status.get("status") in ("complete", "error"):
+                finished = events.pop(request_id, None)
+                if finished is not None:
+                    finished.set()
+                yield f"data: {app.json.dumps(status or {'status': 'error', 'message': 'Request ID not found'})}\n\n"
+                return
+            if not event.wait(SSE_KEEPALIVE_SECONDS):
+                # Comment line keeps proxies from closing the idle connection
+                yield ": keepalive\n\n"
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
 # API endpoint to add an image to the storyboard
 @app.route('/api/storyboard/add', methods=['POST'])
 def add_to_storyboard_api():
@@ -555,8 +950,7 @@ def add_to_storyboard_api():
         data = request.json
         image_path = data.get('imagePath')  # This could be an absolute path or relative URL
         
-        print(f"=== ADDING IMAGE TO STORYBOARD ===")
-        print(f"Received image_path: {image_path}")
+        logger.debug("Adding image to storyboard: %s", image_path)
         
         if not image_path:
             return jsonify({"error": "No image path provided"}), 400
@@ -573,23 +967,25 @@ def add_to_storyboard_api():
             # Assume it's already an absolute path
             absolute_path = image_path
             
-        print(f"Resolved absolute_path: {absolute_path}")
-        print(f"File exists: {os.path.exists(absolute_path)}")
+        logger.debug("Resolved absolute_path: %s", absolute_path)
+        
+        # A voice save-and-enhance canvas may still be on its way to disk
+        if not wait_for_save(os.path.basename(absolute_path)):
+            return jsonify({"error": f"Image file {absolute_path} is still being saved"}), 503
             
         # Verify file exists
         if not os.path.exists(absolute_path):
             return jsonify({"error": f"Image file not found at {absolute_path}"}), 404
             
+        # Check if this is a duplicate (image was already in storyboard)
+        with storyboard_lock:
+            is_duplicate = absolute_path in storyboard
+        
         # Add image to storyboard
         success = add_to_storyboard(absolute_path)
         
-        print(f"Add to storyboard success: {success}")
-        print(f"Current storyboard_images: {storyboard_images}")
-        print(f"Current storyboard_image_data filenames: {[img.get('filename', 'unknown') for img in storyboard_image_data]}")
-        
         if success:
-            # Check if this was a duplicate (image was already in storyboard)
-            is_duplicate = absolute_path in storyboard_images[:-1]  # Check if it existed before we added it
+            storyboard_images, storyboard_image_data = storyboard_snapshot()
             
             # Return the updated storyboard
             return jsonify({
@@ -606,19 +1002,15 @@ def add_to_storyboard_api():
             
     except Exception as e:
         error_msg = f"Error adding image to storyboard: {str(e)}"
-        print(error_msg)
-        import traceback
-        traceback.print_exc()
+        logger.exception(error_msg)
         return jsonify({"error": error_msg}), 500
 
 # API endpoint to get current storyboard
 @app.route('/api/storyboard', methods=['GET'])
 def get_storyboard():
     try:
-        print(f"=== GET STORYBOARD DEBUG ===")
-        print(f"storyboard_images: {storyboard_images}")
-        print(f"storyboard_image_data: {[img.get('filename', 'unknown') for img in storyboard_image_data]}")
-        print(f"Number of images: {len(storyboard_images)}")
+        storyboard_images, storyboard_image_data = storyboard_snapshot()
+        logger.debug("Storyboard has %d images: %s", len(storyboard_images), storyboard_images)
         
         return jsonify({
             "success": True,
@@ -629,16 +1021,15 @@ def get_storyboard():
         })
     except Exception as e:
         error_msg = f"Error getting storyboard: {str(e)}"
-        print(error_msg)
+        logger.exception(error_msg)
         return jsonify({"error": error_msg}), 500
 
 # API endpoint to clear the storyboard
 @app.route('/api/storyboard/clear', methods=['POST'])
 def clear_storyboard():
     try:
-        global storyboard_images, storyboard_image_data
-        storyboard_images.clear()
-        storyboard_image_data.clear()
+        with storyboard_lock:
+            storyboard.clear()
         
         return jsonify({
             "success": True,
@@ -646,14 +1037,13 @@ def clear_storyboard():
         })
     except Exception as e:
         error_msg = f"Error clearing storyboard: {str(e)}"
-        print(error_msg)
+        logger.exception(error_msg)
         return jsonify({"error": error_msg}), 500
 
 # API endpoint to delete a specific image from the storyboard
 @app.route('/api/storyboard/delete', methods=['POST'])
 def delete_from_storyboard():
     try:
-        global storyboard_images, storyboard_image_data
         data = request.json
         image_path = data.get('imagePath')
         image_index = data.get('imageIndex')  # New parameter for specific instance
@@ -673,27 +1063,20 @@ def delete_from_storyboard():
             # Assume it's already an absolute path
             absolute_path = image_path
         
-        # If index is provided, delete the specific instance
-        if image_index is not None and 0 <= image_index < len(storyboard_images):
-            # Remove the specific instance by index
-            removed_path = storyboard_images.pop(image_index)
-            print(f"Removed image at index {image_index}: {removed_path}")
-            
-            # Also remove the corresponding image data
-            if image_index < len(storyboard_image_data):
-                removed_data = storyboard_image_data.pop(image_index)
-                print(f"Removed image data at index {image_index}: {removed_data.get('filename', 'unknown')}")
-        else:
-            # Fallback: Find and remove the first occurrence of the image
-            if absolute_path in storyboard_images:
-                storyboard_images.remove(absolute_path)
-                print(f"Removed first occurrence of: {absolute_path}")
-                
-                # Also remove from image data array
-                storyboard_image_data = [img for img in storyboard_image_data if img.get('path') != absolute_path]
+        with storyboard_lock:
+            # If index is provided, delete the specific instance
+            if image_index is not None and 0 <= image_index < len(storyboard):
+                # Remove the specific instance by index
+                removed_path = list(storyboard)[image_index]
+                del storyboard[removed_path]
+                logger.info("Removed image at index %d: %s", image_index, removed_path)
+            # Fallback: remove the image by its path
+            elif storyboard.pop(absolute_path, None) is not None:
+                logger.info("Removed image: %s", absolute_path)
             else:
                 return jsonify({"error": "Image not found in storyboard"}), 404
         
+        storyboard_images, storyboard_image_data = storyboard_snapshot()
         return jsonify({
             "success": True,
             "message": "Image removed from storyboard",
@@ -705,25 +1088,19 @@ def delete_from_storyboard():
             
     except Exception as e:
         error_msg = f"Error deleting image from storyboard: {str(e)}"
-        print(error_msg)
-        import traceback
-        traceback.print_exc()
+        logger.exception(error_msg)
         return jsonify({"error": error_msg}), 500
 
 # API endpoint to generate video from storyboard
 @app.route('/api/generate-video', methods=['POST'])
 def generate_video_api():
-    global is_video_processing
-    
     try:
         data = request.json or {}
         story_context = data.get('storyContext', '')
         include_music = data.get('includeMusic', False)
-        print(f"=== VIDEO GENERATION REQUEST ===")
-        print(f"Current storyboard_images: {storyboard_images}")
-        print(f"Current storyboard_image_data: {[img.get('filename', 'unknown') for img in storyboard_image_data]}")
-        print(f"Number of storyboard images: {len(storyboard_images)}")
-        print(f"Include music: {include_music}")
+        storyboard_images, _ = storyboard_snapshot()
+        logger.info("Video generation request: %d storyboard images, include music: %s",
+                    len(storyboard_images), include_music)
         
         # Check if enough images are in storyboard
         if len(storyboard_images) < 2:
@@ -732,18 +1109,19 @@ def generate_video_api():
             }), 400
             
         # Check if video generation is already in progress
-        if is_video_processing:
-            return jsonify({
-                "error": "Video generation already in progress",
-                "status": "busy"
-            }), 429  # Too Many Requests
+        if not video_slot.acquire(blocking=False):
+            return busy_response("Video generation already in progress", VIDEO_RETRY_AFTER)
         
         # Generate a unique request ID
-        request_id = f"video_req_{datetime.now().timestamp()}"
+        request_id = next_request_id("video_req")
         
-        # Start video generation in background, pass story_context and include_music
-        is_video_processing = True
-        threading.Thread(target=generate_video_background, args=(request_id, story_context, include_music)).start()
+        # Queue video generation on the video worker, pass story_context and include_music
+        set_video_status(request_id, {"status": "processing", "message": "Video generation started"})
+        try:
+            video_executor.submit(generate_video_background, request_id, story_context, include_music)
+        except Exception:
+            video_slot.release()
+            raise
         
         # Return immediately with request ID for polling
         return jsonify({
@@ -754,44 +1132,56 @@ def generate_video_api():
         
     except Exception as e:
         error_msg = f"Error generating video: {str(e)}"
-        print(error_msg)
-        import traceback
-        traceback.print_exc()
+        logger.exception(error_msg)
         return jsonify({"error": error_msg}), 500
 
 # API endpoint to check video generation status
 @app.route('/api/video-status/<request_id>', methods=['GET'])
 def check_video_status(request_id):
     try:
-        if request_id not in video_processing_status:
-            return jsonify({"error": "Request ID not found"}), 404
+        status = get_video_status(request_id)
+        if status is None:
+            return jsonify({"error": "Request ID not found or expired"}), 404
             
-        status = video_processing_status[request_id]
-        return jsonify(status)
+        return status_response(status)
         
     except Exception as e:
         error_msg = f"Error checking video status: {str(e)}"
-        print(error_msg)
+        logger.exception(error_msg)
         return jsonify({"error": error_msg}), 500
 
+# API endpoint to stream the result of a video generation request (Server-Sent Events)
+# Pushes the final status as soon as the render finishes instead of the client polling video-status
+@app.route('/api/video-stream/<request_id>', methods=['GET'])
+def stream_video_status(request_id):
+    if get_video_status(request_id) is None:
+        return jsonify({"error": "Request ID not found or expired"}), 404
+    
+    return stream_final_status(request_id, get_video_status, video_events)
+
+# Command that opens a file in the system default app; the host OS does not change at runtime
+SYSTEM_NAME = platform.system()
+DEFAULT_OPENER = {'Darwin': ('open',), 'Windows': None}.get(SYSTEM_NAME, ('xdg-open',))  # Linux otherwise
+
+# Launch the default app without waiting for it - the player may stay open long after the request
+def open_with_default_app(path):
+    if DEFAULT_OPENER is None:
+        os.startfile(path)
+    else:
+        subprocess.Popen(DEFAULT_OPENER + (path,), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
 # API endpoint to play a video
 @app.route('/api/play-video/<video_filename>', methods=['POST'])
 def play_video(video_filename):
     try:
         # Build full path to video file
-        video_path = os.path.join(story_videos_dir, video_filename)
+        video_path = safe_served_path(story_videos_dir, video_filename, VIDEO_FILENAME_RE)
         
-        if not os.path.exists(video_path):
+        if video_path is None or not os.path.exists(video_path):
             return jsonify({"error": f"Video file not found: {video_filename}"}), 404
             
         # Play video using system default player
-        system = platform.system()
-        if system == 'Darwin':  # macOS
-            subprocess.call(('open', video_path))
-        elif system == 'Windows':
-            os.startfile(video_path)
-        else:  # Linux
-            subprocess.call(('xdg-open', video_path))
+        open_with_default_app(video_path)
             
         return jsonify({
             "success": True,
@@ -800,59 +1190,51 @@ def play_video(video_filename):
         
     except Exception as e:
         error_msg = f"Error playing video: {str(e)}"
-        print(error_msg)
+        logger.exception(error_msg)
         return jsonify({"error": error_msg}), 500
 
 # API endpoint to enhance image via voice command
 @app.route('/api/enhance-image-voice', methods=['POST'])
 def enhance_image_voice():
-    global is_processing
-    
     try:
         data = request.json
         prompt = data.get('prompt', 'Enhance this drawing with more detail and artistic flair')
         
-        print(f"Received voice-triggered enhancement request with prompt: {prompt}")
-        
-        # Check if another enhancement is already in progress
-        if is_processing:
-            print("Voice enhancement request rejected: Another enhancement is already in progress")
-            return jsonify({
-                "error": "Another enhancement is already in progress", 
-                "status": "busy"
-            }), 429  # Too Many Requests
+        logger.info("Received voice-triggered enhancement request with prompt: %s", prompt)
         
-        # Wait a moment for any pending saves to complete
-        time.sleep(0.5)
+        # Wait for any pending saves to complete
+        if not wait_for_all_saves():
+            logger.warning("Timed out waiting for pending canvas saves")
         
-        # Find the most recent image in the img directory
-        img_files = [f for f in os.listdir(img_dir) if f.lower().endswith(('.png', '.jpg', '.jpeg'))]
-        if not img_files:
+        # Find the most recent image in the img directory - one pass, and DirEntry caches its stat
+        with os.scandir(img_dir) as entries:
+            latest_entry = max((entry for entry in entries if entry.name.lower().endswith(('.png', '.jpg', '.jpeg'))),
+                               key=lambda entry: entry.stat().st_mtime_ns, default=None)
+        if latest_entry is None:
             return jsonify({"error": "No images found to enhance"}), 404
         
-        # Sort by modification time and get the most recent
-        img_files.sort(key=lambda x: os.path.getmtime(os.path.join(img_dir, x)), reverse=True)
-        latest_image = img_files[0]
-        filepath = os.path.join(img_dir, latest_image)
+        latest_image = latest_entry.name
+        filepath = latest_entry.path
         
         # Get the file modification time to verify it's recent
-        file_mtime = os.path.getmtime(filepath)
+        file_mtime = latest_entry.stat().st_mtime
         current_time = time.time()
         time_diff = current_time - file_mtime
         
-        print(f"Using latest image for voice enhancement: {latest_image}")
-        print(f"Image was modified {time_diff:.2f} seconds ago")
+        logger.info("Using latest image for voice enhancement: %s (modified %.2f seconds ago)",
+                    latest_image, time_diff)
         
         # If the image is older than 10 seconds, it might not be the current drawing
         if time_diff > 10:
-            print(f"Warning: Latest image is {time_diff:.2f} seconds old - may not be current drawing")
+            logger.warning("Latest image is %.2f seconds old - may not be current drawing", time_diff)
         
         # Generate a unique request ID
-        request_id = f"voice_req_{datetime.now().timestamp()}"
-        print(f"Starting voice-triggered enhancement with request ID: {request_id}")
+        request_id = next_request_id("voice_req")
+        logger.info("Starting voice-triggered enhancement with request ID %s", request_id)
         
-        # Trigger the enhancement in a background thread
-        enhance_drawing_with_gemini(filepath, prompt, request_id)
+        # Queue the enhancement on the Gemini pool, or turn the request away if the pool is full
+        if not enhance_drawing_with_gemini(filepath, prompt, request_id):
+            return busy_response("Too many enhancements already in progress", ENHANCE_RETRY_AFTER)
         
         # Return immediately with the request ID for status polling
         return jsonify({
@@ -864,62 +1246,62 @@ def enhance_image_voice():
         })
     except Exception as e:
         error_msg = f"Error requesting voice-triggered image enhancement: {str(e)}"
-        print(error_msg)
-        # Log detailed error information for debugging
-        import traceback
-        traceback.print_exc()
+        logger.exception(error_msg)
         return jsonify({"error": "Failed to process voice enhancement request", "details": str(e)}), 500
 
 # API endpoint to save and enhance current canvas via voice command
 @app.route('/api/save-and-enhance-voice', methods=['POST'])
 def save_and_enhance_voice():
-    global is_processing
-    
     try:
         data = request.json
         prompt = data.get('prompt', 'Enhance this drawing with more detail and artistic flair')
         canvas_data = data.get('canvasData')  # Base64 canvas data from frontend
         
-        print(f"Received save-and-enhance voice request with prompt: {prompt}")
-        
-        # Check if another enhancement is already in progress
-        if is_processing:
-            print("Save-and-enhance request rejected: Another enhancement is already in progress")
-            return jsonify({
-                "error": "Another enhancement is already in progress", 
-                "status": "busy"
-            }), 429  # Too Many Requests
+        logger.info("Received save-and-enhance voice request with prompt: %s", prompt)
         
         if not canvas_data:
             return jsonify({"error": "No canvas data provided"}), 400
         
+        # Decode once and keep the bytes: the write is queued on the I/O pool, and the same
+        # buffer goes to the Gemini job so the upload does not wait for the disk
+        try:
+            image_bytes = b64decode(strip_data_url(canvas_data))
+        except (TypeError, ValueError):
+            return jsonify({"error": "Canvas data is not valid base64"}), 400
+        
+        # Same canvas and prompt as a request that is still running or recently finished
+        fingerprint = gemini_cache_key(image_bytes, prompt)
+        duplicate = find_recent_canvas_request(fingerprint)
+        if duplicate is not None:
+            logger.info("Save-and-enhance matches request %s, not starting a new one", duplicate[0])
+            return jsonify({
+                "success": True,
+                "requestId": duplicate[0],
+                "status": "deduplicated",
+                "message": "Same canvas is already being enhanced",
+                "savedImage": duplicate[1]
+            })
+        
         # Save the canvas data first
         try:
-            # Extract the base64 data from the data URL
-            base64_data = canvas_data.replace('data:image/png;base64,', '')
-            
-            # Generate a unique filename with timestamp
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"voice-enhanced-{timestamp}.png"
+            # Generate a unique filename
+            filename = next_filename("voice-enhanced")
             filepath = os.path.join(img_dir, filename)
-            
-            # Save the file
-            with open(filepath, 'wb') as f:
-                f.write(base64.b64decode(base64_data))
-            
-            print(f"Canvas saved to {filepath}")
+            save_file_async(filepath, image_bytes)
             
         except Exception as save_error:
             error_msg = f"Error saving canvas: {str(save_error)}"
-            print(error_msg)
+            logger.exception(error_msg)
             return jsonify({"error": error_msg}), 500
         
         # Generate a unique request ID
-        request_id = f"voice_req_{datetime.now().timestamp()}"
-        print(f"Starting save-and-enhance with request ID: {request_id}")
+        request_id = next_request_id("voice_req")
+        logger.info("Starting save-and-enhance with request ID %s", request_id)
         
-        # Trigger the enhancement in a background thread
-        enhance_drawing_with_gemini(filepath, prompt, request_id)
+        # Queue the enhancement on the Gemini pool, or turn the request away if the pool is full
+        if not enhance_drawing_with_gemini(filepath, prompt, request_id, image_bytes=image_bytes):
+            return busy_response("Too many enhancements already in progress", ENHANCE_RETRY_AFTER)
+        remember_canvas_request(fingerprint, request_id, filename)
         
         # Return immediately with the request ID for status polling
         return jsonify({
@@ -930,86 +1312,41 @@ def save_and_enhance_voice():
         })
     except Exception as e:
         error_msg = f"Error in save-and-enhance: {str(e)}"
-        print(error_msg)
-        # Log detailed error information for debugging
-        import traceback
-        traceback.print_exc()
+        logger.exception(error_msg)
         return jsonify({"error": "Failed to process save-and-enhance request", "details": str(e)}), 500
 
 # API endpoint to modify an existing enhanced image based on voice commands
 @app.route('/api/modify-image', methods=['POST'])
 def modify_image():
     """Modify an existing enhanced image based on voice commands"""
-    global is_processing
-    
     try:
         data = request.get_json()
         prompt = data.get('prompt', '')
         
-        print(f"🎨 Modification request received with prompt: {prompt}")
+        logger.info("Modification request received with prompt: %s", prompt)
         
         # Generate a unique request ID
-        request_id = f"modify_{int(time.time())}"
-        
-        # Check if we're already processing
-        if is_processing:
-            return jsonify({
-                "status": "error",
-                "message": "Another modification is already in progress. Please wait.",
-                "request_id": request_id
-            }), 400
+        request_id = next_request_id("modify")
         
         # Find the most recent enhanced image
-        enhanced_files = [f for f in os.listdir(enhanced_dir) if f.startswith('enhanced_') and f.endswith('.png')]
-        if not enhanced_files:
+        enhanced_path = find_latest_enhanced()
+        if enhanced_path is None:
             return jsonify({
                 "status": "error",
                 "message": "No enhanced image found to modify. Please enhance an image first.",
                 "request_id": request_id
             }), 404
         
-        # Get the most recent enhanced image
-        enhanced_files.sort(reverse=True)  # Sort by filename (timestamp-based)
-        latest_enhanced = enhanced_files[0]
-        enhanced_path = os.path.join(enhanced_dir, latest_enhanced)
-        
-        print(f"🎨 Found latest enhanced image: {latest_enhanced}")
+        logger.info("Found latest enhanced image: %s", os.path.basename(enhanced_path))
         
-        # Set processing state
-        is_processing = True
-        processing_status[request_id] = {"status": "processing", "message": "Modifying image..."}
-        
-        # Start processing in a separate thread
-        def process_modification():
-            global is_processing
-            try:
-                # Use the same enhancement function but with modification prompt
-                result = enhance_drawing_with_gemini(enhanced_path, prompt, request_id)
-                
-                if result:
-                    processing_status[request_id] = {
-                        "status": "completed",
-                        "message": "Image modification completed successfully",
-                        "enhanced_image": result.get("enhanced_image"),
-                        "filename": result.get("filename")
-                    }
-                else:
-                    processing_status[request_id] = {
-                        "status": "error",
-                        "message": "Failed to modify image"
-                    }
-                    
-            except Exception as e:
-                error_msg = f"Error during modification: {str(e)}"
-                print(error_msg)
-                processing_status[request_id] = {"status": "error", "message": error_msg}
-            finally:
-                is_processing = False
-        
-        # Start the processing thread
-        thread = threading.Thread(target=process_modification)
-        thread.daemon = True
-        thread.start()
+        # Use the same enhancement function but with modification prompt;
+        # it queues the Gemini call on the worker pool and records progress in processing_status
+        if not enhance_drawing_with_gemini(enhanced_path, prompt, request_id):
+            return jsonify({
+                "status": "error",
+                "message": "Too many modifications already in progress. Please wait.",
+                "request_id": request_id
+            }), 400
         
         return jsonify({
             "status": "processing",
@@ -1019,8 +1356,7 @@ def modify_image():
         
     except Exception as e:
         error_msg = f"Error in modification API: {str(e)}"
-        print(error_msg)
-        is_processing = False
+        logger.exception(error_msg)
         return jsonify({
             "status": "error",
             "message": error_msg
@@ -1031,9 +1367,9 @@ def modify_image():
 def check_modification_status(request_id):
     """Check the status of a modification request"""
     try:
-        if request_id in processing_status:
-            status_info = processing_status[request_id]
-            return jsonify(status_info)
+        status_info = get_enhancement_status(request_id)
+        if status_info is not None:
+            return status_response(status_info)
         else:
             return jsonify({
                 "status": "not_found",
@@ -1046,102 +1382,100 @@ def check_modification_status(request_id):
         }), 500
 
 # Serve static files from the various directories
+# Files we write are flat names like canvas-drawing-<ts>.png, and each route only serves its
+# own media type; anything else (subpaths, "..", dotfiles, other types) is rejected before any disk access
+def served_filename_re(extensions):
+    return re.compile(r'[\w\-][\w.\-]{0,123}\.(?:%s)' % extensions, re.IGNORECASE)
+
+IMAGE_FILENAME_RE = served_filename_re('png|jpe?g')
+VIDEO_FILENAME_RE = served_filename_re('mp4')
+AUDIO_FILENAME_RE = served_filename_re('mp3|wav')
+
+# Full path of a servable file inside directory, or None if the name does not match pattern
+def safe_served_path(directory, filename, pattern):
+    if not pattern.fullmatch(filename):
+        return None
+    return safe_join(directory, filename)
+
+# Saved and enhanced image filenames are never reused, so browsers may cache them for good
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Send a media file from one of the backend folders, or hand it to nginx when X-Accel-Redirect is on
+def send_media_file(directory, filename, as_attachment=False):
+    if not X_ACCEL_REDIRECT_PREFIX:
+        return send_from_directory(directory, filename, conditional=True, as_attachment=as_attachment)
+    
+    folder = os.path.relpath(directory, BASE_DIR).replace(os.sep, "/")
+    response = Response(mimetype=mimetypes.guess_type(filename)[0] or "application/octet-stream")
+    response.headers["X-Accel-Redirect"] = f"{X_ACCEL_REDIRECT_PREFIX}/{folder}/{quote(filename)}"
+    if as_attachment:
+        response.headers.set("Content-Disposition", "attachment", filename=filename)
+    return response
+
+# Send a saved image straight from disk - send_from_directory adds ETag/Last-Modified, answers
+# 304s and Range requests, and never re-encodes. ?download=1 sends it as an attachment for
+# "save as" links
+def serve_saved_image(directory, filename):
+    if safe_served_path(directory, filename, IMAGE_FILENAME_RE) is None:
+        abort(404)
+    
+    # A voice save-and-enhance canvas may still be on its way to disk
+    if not wait_for_save(filename):
+        abort(503)
+    
+    response = send_media_file(directory, filename, as_attachment=request.args.get('download') == '1')
+    response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+    return response
+
 @app.route('/img/<path:filename>')
 def serve_image(filename):
-    try:
-        # Read the image and serve it correctly
-        img_path = os.path.join(img_dir, filename)
-        if os.path.exists(img_path):
-            # Try to read as PIL Image first (for RGB images)
-            try:
-                pil_img = Image.open(img_path)
-                # Convert PIL image to RGB if it's not already
-                if pil_img.mode != 'RGB':
-                    pil_img = pil_img.convert('RGB')
-                
-                # Convert to base64 and serve
-                img_buffer = BytesIO()
-                pil_img.save(img_buffer, format='PNG')
-                return Response(img_buffer.getvalue(), mimetype='image/png')
-                
-            except Exception as pil_error:
-                # Fallback to OpenCV for BGR images
-                print(f"PIL failed, trying OpenCV: {pil_error}")
-                img = cv2.imread(img_path)
-                if img is not None:
-                    # Convert BGR to RGB to fix color inversion issue
-                    img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-                    # Encode as PNG
-                    _, buffer = cv2.imencode('.png', img_rgb)
-                    return Response(buffer.tobytes(), mimetype='image/png')
-    except Exception as e:
-        print(f"Error serving image {filename}: {e}")
-    
-    # Fallback to direct file serving
-    return send_from_directory(img_dir, filename)
+    return serve_saved_image(img_dir, filename)
 
 @app.route('/enhanced_drawings/<path:filename>')
 def serve_enhanced_image(filename):
-    try:
-        # Read the image and serve it correctly
-        img_path = os.path.join(enhanced_dir, filename)
-        if os.path.exists(img_path):
-            # Try to read as PIL Image first (for RGB images)
-            try:
-                pil_img = Image.open(img_path)
-                # Convert PIL image to RGB if it's not already
-                if pil_img.mode != 'RGB':
-                    pil_img = pil_img.convert('RGB')
-                
-                # Convert to base64 and serve
-                img_buffer = BytesIO()
-                pil_img.save(img_buffer, format='PNG')
-                return Response(img_buffer.getvalue(), mimetype='image/png')
-                
-            except Exception as pil_error:
-                # Fallback to OpenCV for BGR images
-                print(f"PIL failed, trying OpenCV: {pil_error}")
-                img = cv2.imread(img_path)
-                if img is not None:
-                    # Convert BGR to RGB to fix color inversion issue
-                    img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-                    # Encode as PNG
-                    _, buffer = cv2.imencode('.png', img_rgb)
-                    return Response(buffer.tobytes(), mimetype='image/png')
-    except Exception as e:
-        print(f"Error serving enhanced image {filename}: {e}")
-    
-    # Fallback to direct file serving
-    return send_from_directory(enhanced_dir, filename)
+    return serve_saved_image(enhanced_dir, filename)
 
+# conditional=True makes werkzeug answer Range requests with 206 Partial Content, so the
+# <video>/<audio> element can seek and start playing without downloading the whole file
 @app.route('/videos/<path:filename>')
 def serve_video(filename):
-    return send_from_directory(story_videos_dir, filename)
+    if safe_served_path(story_videos_dir, filename, VIDEO_FILENAME_RE) is None:
+        abort(404)
+    return send_media_file(story_videos_dir, filename)
 
 
 @app.route('/gen_music/<path:filename>')
 def serve_music(filename):
-    return send_from_directory(gen_music_dir, filename)
+    if safe_served_path(gen_music_dir, filename, AUDIO_FILENAME_RE) is None:
+        abort(404)
+    return send_media_file(gen_music_dir, filename)
 
 # Debug endpoint to check storyboard state
 @app.route('/api/debug/storyboard', methods=['GET'])
 def debug_storyboard():
     try:
-        print(f"=== DEBUG STORYBOARD ENDPOINT ===")
-        print(f"storyboard_images: {storyboard_images}")
-        print(f"storyboard_image_data: {[img.get('filename', 'unknown') for img in storyboard_image_data]}")
-        print(f"Number of images: {len(storyboard_images)}")
+        storyboard_images, storyboard_image_data = storyboard_snapshot()
+        logger.debug("Debug storyboard: %s", storyboard_images)
         
-        # Check if files exist
+        # Check if files exist - one scandir per folder instead of a stat per image
+        present = {}
+        for folder in {os.path.dirname(img_path) for img_path in storyboard_images}:
+            try:
+                with os.scandir(folder or '.') as entries:
+                    present[folder] = {entry.name for entry in entries if entry.is_file()}
+            except OSError:
+                present[folder] = set()
+
         existing_files = []
         for img_path in storyboard_images:
-            exists = os.path.exists(img_path)
+            filename = os.path.basename(img_path)
             existing_files.append({
                 "path": img_path,
-                "exists": exists,
-                "filename": os.path.basename(img_path)
+                "exists": filename in present[os.path.dirname(img_path)],
+                "filename": filename
             })
-            print(f"File {img_path} exists: {exists}")
+        logger.info("Debug storyboard: %d/%d files present",
+                    sum(f['exists'] for f in existing_files), len(existing_files))
         
         return jsonify({
             "success": True,
@@ -1152,29 +1486,41 @@ def debug_storyboard():
         })
     except Exception as e:
         error_msg = f"Error in debug storyboard: {str(e)}"
-        print(error_msg)
+        logger.exception(error_msg)
         return jsonify({"error": error_msg}), 500
 
 # Test endpoint to verify connection
 @app.route('/api/test', methods=['GET'])
 def test_connection():
     """Test endpoint to verify frontend can reach backend"""
-    return jsonify({"success": True, "message": "Backend connection working", "timestamp": datetime.now().isoformat()})
+    return jsonify({"success": True, "message": "Backend connection working", "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")})
+
+# Signal file the launcher scripts watch to shut the servers down
+BROWSER_CLOSED_FLAG = "/tmp/browser_closed"
 
 # API endpoint to handle browser close
 @app.route('/api/browser-closed', methods=['POST'])
 def browser_closed():
     """Handle browser close event and trigger server shutdown"""
     try:
-        print("🚨 Browser close detected via HTTP endpoint")
-        # Create the browser closed signal file
-        with open("/tmp/browser_closed", "w") as f:
-            f.write("browser_closed")
-        print("✅ Browser closed signal file created")
+        logger.info("Browser close detected via HTTP endpoint")
+        # Create the browser closed signal file with raw fd calls - no Python file object
+        fd = os.open(BROWSER_CLOSED_FLAG, os.O_CREAT | os.O_WRONLY | os.O_TRUNC, 0o644)
+        try:
+            os.write(fd, b"browser_closed")
+        finally:
+            os.close(fd)
+        logger.info("Browser closed signal file created")
         return jsonify({"success": True, "message": "Browser close signal sent"})
     except Exception as e:
-        print(f"❌ Error handling browser close: {e}")
+        logger.exception("Error handling browser close: %s", e)
         return jsonify({"error": str(e)}), 500
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5001, debug=True) 
\ No newline at end of file
+    if os.getenv('FLASK_DEV'):
+        # Werkzeug dev server with reloader and debugger - for local development only
+        app.run(host='0.0.0.0', port=5001, debug=True)
+    else:
+        from waitress import serve
+        # One process with a thread pool: storyboard and enhancement state live in memory
+        serve(app, host='0.0.0.0', port=5001, threads=int(os.getenv('WAITRESS_THREADS', '16')))
@@ -0,0 +1,24 @@
+# Gunicorn settings for the Flask API: gunicorn -c gunicorn.conf.py app:app
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5001")
+
+# Storyboard, enhancement status and the Gemini result cache live in process memory, so the API
+# runs as one worker process by default. Raise GUNICORN_WORKERS only once that state is shared.
+workers = int(os.getenv("GUNICORN_WORKERS", "1"))
+
+# Threads carry the concurrency: Gemini calls and SSE streams spend their time waiting on I/O
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "16"))
+
+# Gemini image generation can take well over the default 30s
+timeout = 120
+graceful_timeout = 30
+keepalive = 5
+
+# No preload_app: with a single worker it saves nothing, and app.py starts threads at import
+# (log listener, executors) that would not survive the fork into the worker
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.getenv("LOGLEVEL", "info").lower()
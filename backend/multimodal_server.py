@@ -293,11 +293,21 @@ async def process_user_speech_for_commands(audio_data):
         print(f"Error processing user speech: {e}")
         return None
 
+# One keep-alive session to the Flask API, created on first use inside the running event loop,
+# so voice commands reuse the connection instead of opening a new one per call
+api_session = None
+
+def get_api_session():
+    global api_session
+    if api_session is None or api_session.closed:
+        api_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=8, keepalive_timeout=75)
+        )
+    return api_session
+
 async def call_enhancement_api(prompt="", websocket=None):
     """Call the Flask enhancement API directly - save drawing first, then enhance"""
     try:
-        import aiohttp
-        
         print("🚀 Starting voice enhancement process")
             
         # First, request the frontend to save the current drawing
@@ -313,37 +323,37 @@ async def call_enhancement_api(prompt="", websocket=None):
         
         # Now call the voice enhancement API - it will find the most recent saved image
         print("🎨 Calling enhancement API with most recent saved image...")
-        async with aiohttp.ClientSession() as session:
-            url = "http://localhost:5001/api/enhance-image-voice"
-            data = {"prompt": "Enhance this sketch into an image with more detail"}
-            
-            print(f"📤 Calling voice enhancement API: {url}")
-            async with session.post(url, json=data) as response:
-                if response.status == 200:
-                    result = await response.json()
-                    print(f"✅ Enhancement started: {result}")
-                    
-                    # Send success message back to frontend
-                    if websocket:
-                        await websocket.send(json.dumps({
-                            "text": "I'll enhance your drawing with Gemini AI now! Enhancement started successfully.",
-                            "command_detected": "enhance",
-                            "enhancement_started": True,
-                            "enhancement_error": False,
-                            "request_id": result.get("request_id")
-                        }))
-                    
-                    return result
-                else:
-                    print(f"❌ Enhancement failed: {response.status}")
-                    if websocket:
-                        await websocket.send(json.dumps({
-                            "text": "Sorry, I couldn't enhance your drawing. Please try again.",
-                            "command_detected": "enhance",
-                            "enhancement_started": False,
-                            "enhancement_error": True
-                        }))
-                    return None
+        session = get_api_session()
+        url = "http://localhost:5001/api/enhance-image-voice"
+        data = {"prompt": "Enhance this sketch into an image with more detail"}
+        
+        print(f"📤 Calling voice enhancement API: {url}")
+        async with session.post(url, json=data) as response:
+            if response.status == 200:
+                result = await response.json()
+                print(f"✅ Enhancement started: {result}")
+                
+                # Send success message back to frontend
+                if websocket:
+                    await websocket.send(json.dumps({
+                        "text": "I'll enhance your drawing with Gemini AI now! Enhancement started successfully.",
+                        "command_detected": "enhance",
+                        "enhancement_started": True,
+                        "enhancement_error": False,
+                        "request_id": result.get("request_id")
+                    }))
+                
+                return result
+            else:
+                print(f"❌ Enhancement failed: {response.status}")
+                if websocket:
+                    await websocket.send(json.dumps({
+                        "text": "Sorry, I couldn't enhance your drawing. Please try again.",
+                        "command_detected": "enhance",
+                        "enhancement_started": False,
+                        "enhancement_error": True
+                    }))
+                return None
         
     except Exception as e:
         print(f"❌ Error calling enhancement API: {e}")
@@ -359,8 +369,6 @@ async def call_enhancement_api(prompt="", websocket=None):
 async def call_modification_api(prompt="", websocket=None):
     """Call the Flask modification API to modify the current enhanced image"""
     try:
-        import aiohttp
-        
         print("🎨 Starting voice modification process")
             
         # First, request the frontend to save the current drawing (enhanced image)
@@ -376,37 +384,37 @@ async def call_modification_api(prompt="", websocket=None):
         
         # Now call the modification API - it will find the most recent saved image
         print("🎨 Calling modification API with most recent saved image...")
-        async with aiohttp.ClientSession() as session:
-            url = "http://localhost:5001/api/modify-image"
-            data = {"prompt": prompt}
-            
-            print(f"📤 Calling modification API: {url} with prompt: {prompt}")
-            async with session.post(url, json=data) as response:
-                if response.status == 200:
-                    result = await response.json()
-                    print(f"✅ Modification started: {result}")
-                    
-                    # Send success message back to frontend
-                    if websocket:
-                        await websocket.send(json.dumps({
-                            "text": f"Perfect! I'll modify your drawing: {prompt}",
-                            "command_detected": "modify",
-                            "modification_started": True,
-                            "modification_error": False,
-                            "request_id": result.get("request_id")
-                        }))
-                    
-                    return result
-                else:
-                    print(f"❌ Modification failed: {response.status}")
-                    if websocket:
-                        await websocket.send(json.dumps({
-                            "text": "Sorry, I couldn't modify your drawing. Please try again.",
-                            "command_detected": "modify",
-                            "modification_started": False,
-                            "modification_error": True
-                        }))
-                    return None
+        session = get_api_session()
+        url = "http://localhost:5001/api/modify-image"
+        data = {"prompt": prompt}
+        
+        print(f"📤 Calling modification API: {url} with prompt: {prompt}")
+        async with session.post(url, json=data) as response:
+            if response.status == 200:
+                result = await response.json()
+                print(f"✅ Modification started: {result}")
+                
+                # Send success message back to frontend
+                if websocket:
+                    await websocket.send(json.dumps({
+                        "text": f"Perfect! I'll modify your drawing: {prompt}",
+                        "command_detected": "modify",
+                        "modification_started": True,
+                        "modification_error": False,
+                        "request_id": result.get("request_id")
+                    }))
+                
+                return result
+            else:
+                print(f"❌ Modification failed: {response.status}")
+                if websocket:
+                    await websocket.send(json.dumps({
+                        "text": "Sorry, I couldn't modify your drawing. Please try again.",
+                        "command_detected": "modify",
+                        "modification_started": False,
+                        "modification_error": True
+                    }))
+                return None
         
     except Exception as e:
         print(f"❌ Error calling modification API: {e}")
@@ -1081,8 +1089,12 @@ async def main() -> None:
     print("Running websocket server localhost:9083...")
     print("Server is ready to accept connections!")
     
-    # Keep running
-    await asyncio.Future()
+    # Keep running; close the shared API session on shutdown so aiohttp does not warn about it
+    try:
+        await asyncio.Future()
+    finally:
+        if api_session is not None and not api_session.closed:
+            await api_session.close()
 
 if __name__ == "__main__":
     try:
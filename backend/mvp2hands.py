@@ -333,6 +333,16 @@ auto_enhance_status = "AUTO-ENHANCE: ON"
 last_enhancement_time = time.time()
 last_enhanced_canvas = None
 
+# Adaptive frame skipping: hand tracking runs on every frame_skip-th frame. The skip grows while
+# tracking overruns the frame budget or a Gemini call is running, and shrinks back to 1 once there
+# is headroom. Skipped frames show the last tracked landmarks (up to MAX_FRAME_SKIP - 1 frames old)
+# and leave the canvas alone, since the stale points would only redraw the same stroke end
+HANDS_FRAME_BUDGET = 1.0 / 30
+MAX_FRAME_SKIP = 4
+frame_skip = 1
+frame_index = 0
+results = None
+
 while True:
     # Read frame from webcam
     success, frame = cap.read()
@@ -343,11 +353,18 @@ while True:
     # Flip the frame horizontally for a more intuitive mirror view
     frame = cv2.flip(frame, 1)
     
-    # Convert BGR to RGB
-    rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    
-    # Process hand landmarks
-    results = hands.process(rgb_frame)
+    # Process hand landmarks (skipped frames keep the previous results)
+    frame_index += 1
+    tracked = results is None or frame_index % frame_skip == 0
+    if tracked:
+        # Convert BGR to RGB
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        hands_start = time.perf_counter()
+        results = hands.process(rgb_frame)
+        if is_processing or time.perf_counter() - hands_start > HANDS_FRAME_BUDGET:
+            frame_skip = min(frame_skip + 1, MAX_FRAME_SKIP)
+        elif frame_skip > 1:
+            frame_skip -= 1
     
     # Display canvas on frame
     combined_img = cv2.addWeighted(frame, 0.7, canvas, 0.3, 0)
@@ -398,7 +415,7 @@ while True:
                 cv2.circle(combined_img, current_point, 10, drawing_colors[hand_idx], -1)
                 
                 # Draw line on canvas
-                if prev_points[hand_idx]:
+                if tracked and prev_points[hand_idx]:
                     cv2.line(canvas, prev_points[hand_idx], current_point, drawing_colors[hand_idx], drawing_thickness)
                 
                 prev_points[hand_idx] = current_point
@@ -416,7 +433,7 @@ while True:
                 cv2.circle(combined_img, current_point, eraser_thickness, (0, 0, 0), 2)
                 
                 # Erase from canvas (draw black with thicker line)
-                if prev_points[hand_idx]:
+                if tracked and prev_points[hand_idx]:
                     cv2.line(canvas, prev_points[hand_idx], current_point, (0, 0, 0), eraser_thickness)
                 
                 prev_points[hand_idx] = current_point
@@ -430,7 +447,8 @@ while True:
                 last_drawing_time = time.time()
                 
                 # Clear the entire canvas
-                canvas = np.zeros((h, w, 3), dtype=np.uint8)
+                if tracked:
+                    canvas = np.zeros((h, w, 3), dtype=np.uint8)
                 prev_points = {0: None, 1: None}  # Reset all previous points
                 
             else:
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Test script for write_base64_file in app.py - the chunked data URL decoder used by /api/save-image
+"""
+
+import base64
+import os
+import sys
+import tempfile
+
+from app import BASE64_CHUNK, write_base64_file
+
+# Decoded sizes around the chunk boundaries: one base64 chunk holds BASE64_CHUNK // 4 * 3 bytes.
+# The +1/+2 sizes end in "==" / "=" padding, which then lands at the start of a new chunk
+CHUNK_BYTES = BASE64_CHUNK // 4 * 3
+SIZES = [0, 1, 2, 3, CHUNK_BYTES - 1, CHUNK_BYTES, CHUNK_BYTES + 1, CHUNK_BYTES + 2, 2 * CHUNK_BYTES, 2 * CHUNK_BYTES + 1]
+
+HEADERS = {
+    "bare base64": "",
+    "data URL": "data:image/png;base64,",
+    "long data URL header": "data:image/png;name=" + "canvas-drawing" * 10 + ".png;base64,",
+}
+
+def check(label, ok, detail=""):
+    status = "✅ PASS" if ok else "❌ FAIL"
+    print(f"{status}: {label}" + (f" ({detail})" if detail else ""))
+    return ok
+
+def test_round_trip(tmp):
+    """Bytes written match the original for every size and header style"""
+    results = []
+    for size in SIZES:
+        original = os.urandom(size)
+        encoded = base64.b64encode(original).decode("ascii")
+        for header_label, header in HEADERS.items():
+            path = os.path.join(tmp, "round-trip.png")
+            written = write_base64_file(path, header + encoded)
+            with open(path, "rb") as f:
+                ok = f.read() == original and written == size
+            results.append(check(f"{header_label}, {size} bytes", ok, f"reported {written}"))
+    return all(results)
+
+def test_corrupt_payload(tmp):
+    """A payload that fails to decode raises and leaves no file behind"""
+    results = []
+    for label, data_url in [
+        ("bad padding in the first chunk", "data:image/png;base64,abc"),
+        ("bad padding after a full chunk", "data:image/png;base64," + "A" * BASE64_CHUNK + "abc"),
+    ]:
+        path = os.path.join(tmp, "corrupt.png")
+        try:
+            write_base64_file(path, data_url)
+            raised = False
+        except ValueError:
+            raised = True
+        results.append(check(label, raised and not os.path.exists(path),
+                             f"raised={raised}, file left={os.path.exists(path)}"))
+    return all(results)
+
+if __name__ == "__main__":
+    print(f"Testing write_base64_file (BASE64_CHUNK={BASE64_CHUNK}):")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        passed = all([
+            test_round_trip(tmp),
+            test_corrupt_payload(tmp),
+        ])
+
+    print("\n" + "=" * 50)
+    print("All base64 write checks passed!" if passed else "Some base64 write checks failed")
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Test script for the header-only image size readers in app.py (get_jpeg_size, get_png_size, get_image_size)
+"""
+
+import os
+import sys
+import tempfile
+from io import BytesIO
+
+from PIL import Image
+
+from app import get_image_size, get_jpeg_size, get_png_size
+
+# Odd, unequal dimensions so a swapped width/height shows up
+WIDTH, HEIGHT = 321, 123
+
+def make_image_bytes(format, **save_args):
+    """Encode a small test image with PIL and return the file bytes"""
+    buffer = BytesIO()
+    Image.new("RGB", (WIDTH, HEIGHT), (200, 120, 40)).save(buffer, format, **save_args)
+    return buffer.getvalue()
+
+def make_exif_jpeg():
+    """A JPEG with a large EXIF (APP1) segment ahead of the frame header"""
+    exif = Image.Exif()
+    exif[0x010F] = "CoCo"  # Make
+    exif[0x010E] = "x" * 30000  # ImageDescription, so the reader has to skip a long segment
+    return make_image_bytes("JPEG", exif=exif.tobytes())
+
+def check(label, actual, expected):
+    ok = actual == expected
+    status = "✅ PASS" if ok else "❌ FAIL"
+    print(f"{status}: {label} -> {actual!r}" + ("" if ok else f" (expected {expected!r})"))
+    return ok
+
+def test_jpeg_sizes():
+    """Baseline, progressive and EXIF JPEGs all report their frame size"""
+    samples = {
+        "baseline JPEG": make_image_bytes("JPEG"),
+        "progressive JPEG": make_image_bytes("JPEG", progressive=True),
+        "EXIF JPEG": make_exif_jpeg(),
+    }
+    results = [check(label, get_jpeg_size(BytesIO(data)), (WIDTH, HEIGHT)) for label, data in samples.items()]
+
+    # Fill bytes are allowed before any marker
+    baseline = samples["baseline JPEG"]
+    padded = baseline[:2] + b"\xff\xff\xff" + baseline[2:]
+    results.append(check("JPEG with fill bytes", get_jpeg_size(BytesIO(padded)), (WIDTH, HEIGHT)))
+    return all(results)
+
+def test_truncated_jpeg():
+    """Every prefix that ends before the frame size is complete gives None, never an exception"""
+    data = make_image_bytes("JPEG", progressive=True)
+    sof_end = data.find(b"\xff\xc2") + 9  # marker, length, precision, height, width
+    failures = []
+    for length in range(sof_end):
+        try:
+            size = get_jpeg_size(BytesIO(data[:length]))
+        except Exception as e:
+            size = e
+        if size is not None:
+            failures.append((length, size))
+    ok = check(f"truncated JPEG prefixes 0..{sof_end - 1}", failures, [])
+    return check("JPEG cut right after the frame size", get_jpeg_size(BytesIO(data[:sof_end])), (WIDTH, HEIGHT)) and ok
+
+def test_not_jpeg():
+    """Other formats are left for the next reader"""
+    return all([
+        check("PNG passed to get_jpeg_size", get_jpeg_size(BytesIO(make_image_bytes("PNG"))), None),
+        check("empty file passed to get_jpeg_size", get_jpeg_size(BytesIO(b"")), None),
+    ])
+
+def test_png_sizes():
+    """PNG size comes from the IHDR chunk in the first 24 bytes"""
+    data = make_image_bytes("PNG")
+    return all([
+        check("PNG header", get_png_size(data[:24]), (WIDTH, HEIGHT)),
+        check("truncated PNG header", get_png_size(data[:20]), None),
+        check("JPEG passed to get_png_size", get_png_size(make_image_bytes("JPEG")[:24]), None),
+    ])
+
+def test_image_size_files():
+    """get_image_size on files on disk, including the PIL fallback for other formats"""
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, ext, data in [
+            ("PNG file", "png", make_image_bytes("PNG")),
+            ("EXIF JPEG file", "jpg", make_exif_jpeg()),
+            ("GIF file (PIL fallback)", "gif", make_image_bytes("GIF")),
+        ]:
+            path = os.path.join(tmp, f"sample.{ext}")
+            with open(path, "wb") as f:
+                f.write(data)
+            results.append(check(label, get_image_size(path), (WIDTH, HEIGHT)))
+    return all(results)
+
+if __name__ == "__main__":
+    print("Testing image size readers:")
+    print("=" * 50)
+
+    passed = all([
+        test_jpeg_sizes(),
+        test_truncated_jpeg(),
+        test_not_jpeg(),
+        test_png_sizes(),
+        test_image_size_files(),
+    ])
+
+    print("\n" + "=" * 50)
+    print("All image size checks passed!" if passed else "Some image size checks failed")
+    sys.exit(0 if passed else 1)
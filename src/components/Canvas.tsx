@@ -3,6 +3,7 @@ import { useDrawing } from '../context/DrawingContext'
 import { Point, Shape } from '../types'
 import { renderShape } from '../utils/renderShape'
 import { hitTest } from '../utils/hitTest'
+import { canvasToBlob } from '../utils/canvasToBlob'
 import EnhancedImageActions from './EnhancedImageActions'
 import { Mic, MicOff, Volume2 } from 'lucide-react'
 import { useShapes } from '../ShapesContext'
@@ -21,7 +22,6 @@ interface EnhancedImage {
   width: number;
   height: number;
   prompt: string;
-  base64Data?: string;
   isDragging: boolean;
   isResizing: boolean;
   resizeHandle: string | null;
@@ -36,7 +36,6 @@ interface EnhancedImageResult {
   height: number;
   original_width: number;
   original_height: number;
-  base64Data: string;
   prompt: string;
 }
 
@@ -691,11 +690,11 @@ const Canvas: React.FC<CanvasProps> = () => {
     tempCtx.restore();
   
     try {
-      const dataUrl = tempCanvas.toDataURL('image/png');
+      const pngBlob = await canvasToBlob(tempCanvas);
       const response = await fetch('http://localhost:5001/api/save-image', {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ imageData: dataUrl }),
+        headers: { 'Content-Type': 'image/png' },
+        body: pngBlob,
       });
       if (!response.ok) throw new Error('Failed to save image');
       const result = await response.json();
@@ -804,17 +803,17 @@ const Canvas: React.FC<CanvasProps> = () => {
       });
       
       // Convert to image
-      const dataUrl = tempCanvas.toDataURL('image/png');
-      console.log('🖼️ Image data created, length:', dataUrl.length);
+      const pngBlob = await canvasToBlob(tempCanvas);
+      console.log('🖼️ Image data created, size:', pngBlob.size);
       
-      // Send image data to server
+      // Send the raw PNG bytes to the server
       console.log('📤 Saving image to server...');
       const saveResponse = await fetch('http://localhost:5001/api/save-image', {
         method: 'POST',
         headers: {
-          'Content-Type': 'application/json',
+          'Content-Type': 'image/png',
         },
-        body: JSON.stringify({ imageData: dataUrl }),
+        body: pngBlob,
       });
       
       if (!saveResponse.ok) {
@@ -881,9 +880,9 @@ const Canvas: React.FC<CanvasProps> = () => {
         // Show a toast notification that enhancement is in progress
         window.showToast('Enhancing your drawing with Gemini...', 'info', 3000);
         
-        // Poll for enhancement status
-        console.log('🔄 Starting to poll for enhancement status...');
-        pollEnhancementStatus(result.requestId);
+        // Wait for the enhancement result
+        console.log('🔄 Waiting for enhancement status...');
+        watchEnhancementStatus(result.requestId);
       } else {
         throw new Error('Failed to start enhancement process');
       }
@@ -926,31 +925,8 @@ const Canvas: React.FC<CanvasProps> = () => {
         console.log('⏳ Enhancement still processing, will poll again in 2 seconds...');
         // Continue polling every 2 seconds
         setTimeout(() => pollEnhancementStatus(requestId), 2000);
-      } else if (status.status === 'complete' && status.result) {
-        console.log('✅ Enhancement complete! Result:', status.result);
-        // Enhancement is complete, add the enhanced image to the canvas
-        setEnhancementStatus('complete');
-        
-        // Add as interactive image
-        console.log('🖼️ Adding enhanced image to canvas...');
-        addEnhancedImageToCanvas(status.result);
-        
-        // Show success toast
-        window.showToast('Enhancement complete! Image added to canvas.', 'success', 3000);
-      } else if (status.status === 'error') {
-        console.error('❌ Enhancement failed with error:', status.message);
-        // Enhancement failed
-        setEnhancementStatus('error');
-        
-        // Show a more detailed error message
-        const errorMessage = status.message || 'Unknown error occurred';
-        console.error('Enhancement error:', errorMessage);
-        window.showToast(`Enhancement failed: ${errorMessage}`, 'error', 3000);
       } else {
-        console.warn('⚠️ Unexpected status returned:', status.status);
-        // Unexpected status
-        setEnhancementStatus('error');
-        window.showToast(`Unexpected status returned: ${status.status}`, 'error', 3000);
+        handleEnhancementResult(status);
       }
     } catch (err) {
       console.error('❌ Error polling enhancement status:', err);
@@ -959,6 +935,57 @@ const Canvas: React.FC<CanvasProps> = () => {
     }
   }, []);
 
+  // Wait for the enhancement result over Server-Sent Events, falling back to polling if the stream fails
+  const watchEnhancementStatus = useCallback((requestId: string) => {
+    if (typeof EventSource === 'undefined') {
+      pollEnhancementStatus(requestId);
+      return;
+    }
+    
+    console.log('📡 Streaming enhancement status for requestId:', requestId);
+    const source = new EventSource(`http://localhost:5001/api/enhancement-stream/${requestId}`);
+    source.onmessage = (event) => {
+      source.close();
+      const status = JSON.parse(event.data);
+      console.log('📊 Enhancement status received:', status);
+      handleEnhancementResult(status);
+    };
+    source.onerror = () => {
+      console.warn('⚠️ Enhancement stream failed, falling back to polling');
+      source.close();
+      pollEnhancementStatus(requestId);
+    };
+  }, [pollEnhancementStatus]);
+
+  const handleEnhancementResult = (status: { status: string; message?: string; result?: EnhancedImageResult }) => {
+    if (status.status === 'complete' && status.result) {
+      console.log('✅ Enhancement complete! Result:', status.result);
+      // Enhancement is complete, add the enhanced image to the canvas
+      setEnhancementStatus('complete');
+      
+      // Add as interactive image
+      console.log('🖼️ Adding enhanced image to canvas...');
+      addEnhancedImageToCanvas(status.result);
+      
+      // Show success toast
+      window.showToast('Enhancement complete! Image added to canvas.', 'success', 3000);
+    } else if (status.status === 'error') {
+      console.error('❌ Enhancement failed with error:', status.message);
+      // Enhancement failed
+      setEnhancementStatus('error');
+      
+      // Show a more detailed error message
+      const errorMessage = status.message || 'Unknown error occurred';
+      console.error('Enhancement error:', errorMessage);
+      window.showToast(`Enhancement failed: ${errorMessage}`, 'error', 3000);
+    } else {
+      console.warn('⚠️ Unexpected status returned:', status.status);
+      // Unexpected status
+      setEnhancementStatus('error');
+      window.showToast(`Unexpected status returned: ${status.status}`, 'error', 3000);
+    }
+  };
+
   const getCursorForTool = (tool: string): string => {
     switch (tool) {
       case 'select':
@@ -1060,7 +1087,6 @@ const Canvas: React.FC<CanvasProps> = () => {
         width: displayWidth,
         height: displayHeight,
         prompt: result.prompt,
-        base64Data: result.base64Data,
         isDragging: false,
         isResizing: false,
         resizeHandle: null
@@ -1397,8 +1423,8 @@ const Canvas: React.FC<CanvasProps> = () => {
         console.log('🎯 Voice enhancement command detected:', data);
         
         if (data.enhancement_started && data.request_id) {
-          // Start polling for enhancement status
-          pollEnhancementStatus(data.request_id);
+          // Wait for the enhancement result
+          watchEnhancementStatus(data.request_id);
           
           // Show success message
           if (window.showToast) {
@@ -1420,7 +1446,7 @@ const Canvas: React.FC<CanvasProps> = () => {
     } catch (err) {
       console.error('Error parsing WebSocket message:', err);
     }
-  }, [isDrawing, isMuted, setMultimodalMessages, setVoiceStatus, enhanceDrawingWithGeminiWithPrompt, pollEnhancementStatus]);
+  }, [isDrawing, isMuted, setMultimodalMessages, setVoiceStatus, enhanceDrawingWithGeminiWithPrompt, watchEnhancementStatus]);
 
   const initializeMultimodalAudio = async () => {
     try {
@@ -1685,7 +1711,8 @@ const Canvas: React.FC<CanvasProps> = () => {
   const downloadImage = (imageIndex: number) => {
     const image = interactiveEnhancedImages[imageIndex];
     const link = document.createElement('a');
-    link.href = `data:image/png;base64,${image.base64Data || ''}`;
+    // The backend sends the stored file with Content-Disposition: attachment
+    link.href = `${image.url}?download=1`;
     link.download = image.id;
     document.body.appendChild(link);
     link.click();
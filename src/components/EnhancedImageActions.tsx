@@ -4,7 +4,6 @@ interface EnhancedImageActionsProps {
   imageData: {
     path: string;
     filename: string;
-    base64Data: string;
   };
   onClose?: () => void;
 }
@@ -44,7 +43,9 @@ const EnhancedImageActions: React.FC<EnhancedImageActionsProps> = ({ imageData }
 
   const downloadImage = () => {
     const link = document.createElement('a');
-    link.href = `data:image/png;base64,${imageData.base64Data}`;
+    // The backend sends the stored file with Content-Disposition: attachment
+    const path = imageData.path.replace('http://localhost:5001', '');
+    link.href = `http://localhost:5001${path}?download=1`;
     link.download = imageData.filename;
     document.body.appendChild(link);
     link.click();
@@ -4,11 +4,21 @@ import './Storyboard.css';
 interface StoryboardImage {
   path: string;
   filename: string;
-  base64Data: string;
+  url: string | null;
   width: number;
   height: number;
 }
 
+interface VideoStatusResponse {
+  status: 'processing' | 'complete' | 'error';
+  message?: string;
+  result?: {
+    path: string;
+    url: string;
+    filename: string;
+  };
+}
+
 interface StoryboardProps {
   isOpen: boolean;
   onClose: () => void;
@@ -33,17 +43,39 @@ const Storyboard: React.FC<StoryboardProps> = ({ isOpen, onClose }) => {
     }
   }, [isOpen]);
 
-  // Poll for video status if we have a requestId
+  // Wait for the video result if we have a requestId: the server pushes it over SSE,
+  // and we fall back to polling if the stream can't be opened
   useEffect(() => {
     let intervalId: number | null = null;
+    let source: EventSource | null = null;
 
     if (videoRequestId && videoStatus === 'processing') {
-      intervalId = window.setInterval(() => {
-        checkVideoStatus(videoRequestId);
-      }, 2000); // Poll every 2 seconds
+      const requestId = videoRequestId;
+      const startPolling = () => {
+        intervalId = window.setInterval(() => {
+          checkVideoStatus(requestId);
+        }, 2000); // Poll every 2 seconds
+      };
+
+      if (typeof EventSource === 'undefined') {
+        startPolling();
+      } else {
+        source = new EventSource(`http://localhost:5001/api/video-stream/${requestId}`);
+        source.onmessage = (event) => {
+          source?.close();
+          source = null;
+          handleVideoStatus(JSON.parse(event.data));
+        };
+        source.onerror = () => {
+          source?.close();
+          source = null;
+          startPolling();
+        };
+      }
     }
 
     return () => {
+      source?.close();
       if (intervalId !== null) {
         window.clearInterval(intervalId);
       }
@@ -231,28 +263,31 @@ const Storyboard: React.FC<StoryboardProps> = ({ isOpen, onClose }) => {
       }
       
       const status = await response.json();
-      
-      if (status.status === 'processing') {
-        setStatusMessage('Video generation in progress...');
-      } else if (status.status === 'complete' && status.result) {
-        setVideoStatus('complete');
-        setStatusMessage('Video generation complete!');
-        setVideoResult({
-          url: status.result.url,
-          filename: status.result.filename
-        });
-        window.showToast('Video generated successfully!', 'success', 3000);
-      } else if (status.status === 'error') {
-        setVideoStatus('error');
-        setStatusMessage(`Error: ${status.message || 'Unknown error'}`);
-        window.showToast(`Video generation failed: ${status.message || 'Unknown error'}`, 'error', 3000);
-      }
+      handleVideoStatus(status);
     } catch (err) {
       console.error('Error checking video status:', err);
       setError(`Failed to check video status: ${err instanceof Error ? err.message : String(err)}`);
     }
   };
 
+  const handleVideoStatus = (status: VideoStatusResponse) => {
+    if (status.status === 'processing') {
+      setStatusMessage('Video generation in progress...');
+    } else if (status.status === 'complete' && status.result) {
+      setVideoStatus('complete');
+      setStatusMessage('Video generation complete!');
+      setVideoResult({
+        url: status.result.url,
+        filename: status.result.filename
+      });
+      window.showToast('Video generated successfully!', 'success', 3000);
+    } else if (status.status === 'error') {
+      setVideoStatus('error');
+      setStatusMessage(`Error: ${status.message || 'Unknown error'}`);
+      window.showToast(`Video generation failed: ${status.message || 'Unknown error'}`, 'error', 3000);
+    }
+  };
+
   const playVideo = async (filename: string) => {
     try {
       const response = await fetch(`http://localhost:5001/api/play-video/${filename}`, {
@@ -369,13 +404,8 @@ const Storyboard: React.FC<StoryboardProps> = ({ isOpen, onClose }) => {
               storyboardImages.map((image, index) => (
                 <div key={index} className="storyboard-image relative group">
                   <img
-                    src={`http://localhost:5001${image.path}`}
+                    src={image.url ? `http://localhost:5001${image.url}` : undefined}
                     alt={`Storyboard image ${index + 1}`}
-                    onError={(e) => {
-                      // Fallback to base64 if direct URL fails
-                      const target = e.target as HTMLImageElement;
-                      target.src = `data:image/png;base64,${image.base64Data}`;
-                    }}
                   />
                   <div className="storyboard-image-label">
                     #{index + 1}: {image.filename.substring(0, 15)}...
@@ -0,0 +1,15 @@
+// Promise wrapper around canvas.toBlob - encodes straight to binary, no base64 data URL
+export const canvasToBlob = (
+  canvas: HTMLCanvasElement,
+  type: string = 'image/png'
+): Promise<Blob> => {
+  return new Promise((resolve, reject) => {
+    canvas.toBlob(blob => {
+      if (blob) {
+        resolve(blob);
+      } else {
+        reject(new Error('Failed to encode canvas'));
+      }
+    }, type);
+  });
+};